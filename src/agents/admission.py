@@ -0,0 +1,205 @@
+"""
+Admission control of the requests each agent accepts, shedding load with fast "retry later" answers
+"""
+
+import asyncio
+import json
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import wraps
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional
+
+from src.core.config import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+admission_controllers: Dict[str, "AdmissionController"] = {}
+
+_REJECTION_PREFIX = '{"rejected": true'
+
+
+class AdmissionRejected(Exception):
+    """Raised when an agent cannot start a request before its deadline."""
+
+    def __init__(self, agent: str, retry_after: float):
+        self.agent = agent
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.fallback_response = (
+            f"The {agent} agent is handling too many requests right now, "
+            f"please resubmit the case sheet in {self.retry_after} seconds."
+        )
+        super().__init__(self.fallback_response)
+
+    def response(self) -> str:
+        """The rejection in the JSON string form agents answer with, recognized by :func:`raise_if_rejected`."""
+        return json.dumps(
+            {
+                "rejected": True,
+                "agent": self.agent,
+                "retry_after": self.retry_after,
+                "fallback_response": self.fallback_response,
+            }
+        )
+
+
+def raise_if_rejected(response: Any) -> Any:
+    """Return an agent response unchanged, raising :class:`AdmissionRejected` again when it is a rejection."""
+    if isinstance(response, str) and response.startswith(_REJECTION_PREFIX):
+        rejection = json.loads(response)
+        raise AdmissionRejected(rejection["agent"], rejection["retry_after"])
+    return response
+
+
+class AdmissionController:
+    """
+    Bounds the requests an agent runs at once and how long the others may wait for them.
+
+    At most ``limit`` requests run, and at most ``queue_size`` more wait in arrival order. A request is rejected
+    right away when the queue is full or when the wait expected from the average run time exceeds its deadline, and
+    it is rejected once its deadline passes while still queued, so callers get a quick "retry later" instead of a
+    timeout.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limit: int,
+        queue_size: int = settings.ADMISSION_QUEUE_SIZE,
+        timeout: float = settings.ADMISSION_TIMEOUT,
+        enabled: bool = settings.ADMISSION_CONTROL,
+    ):
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.enabled = enabled
+        self._running = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._run_seconds: Optional[float] = None
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+        self.peak_queue_depth = 0
+        admission_controllers[name] = self
+
+    def expected_wait(self, position: int) -> float:
+        """
+        Seconds until the request at ``position`` in the queue starts, estimated from the average run time.
+
+        The running requests are taken to be spread over their run, so a slot frees up every ``limit``-th of it.
+        """
+        if self._run_seconds is None:
+            return 0.0
+        return (position + 1) * self._run_seconds / self.limit
+
+    async def acquire(self, deadline: Optional[float] = None) -> None:
+        """
+        Wait for a free slot until ``deadline``, a :func:`time.monotonic` time defaulting to ``timeout`` from now.
+
+        Raises:
+            AdmissionRejected: The queue is full, or the request cannot start before the deadline.
+        """
+        if self._running < self.limit and not self._waiters:
+            self._running += 1
+            self.admitted += 1
+            return
+        deadline = deadline if deadline is not None else time.monotonic() + self.timeout
+        expected_wait = self.expected_wait(len(self._waiters))
+        if len(self._waiters) >= self.queue_size:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(self.name, expected_wait)
+        if time.monotonic() + expected_wait > deadline:
+            self.rejected_deadline += 1
+            raise AdmissionRejected(self.name, expected_wait)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        self.peak_queue_depth = max(self.peak_queue_depth, len(self._waiters))
+        try:
+            # the event loop clock is time.monotonic
+            async with asyncio.timeout_at(deadline):
+                await waiter
+        except TimeoutError:
+            # the slot may have been handed over just as the deadline passed
+            if waiter.cancelled():
+                self._waiters.remove(waiter)
+                self.rejected_deadline += 1
+                raise AdmissionRejected(self.name, self.expected_wait(len(self._waiters))) from None
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # the slot was handed over while this request was being cancelled
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            raise
+        self.admitted += 1
+
+    def release(self, run_seconds: Optional[float] = None) -> None:
+        if run_seconds is not None:
+            # exponential moving average, so the estimate follows the current load
+            self._run_seconds = (
+                run_seconds if self._run_seconds is None else 0.8 * self._run_seconds + 0.2 * run_seconds
+            )
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # hand the slot over without freeing it, so no new request overtakes the queue
+                waiter.set_result(None)
+                return
+        self._running -= 1
+
+    @asynccontextmanager
+    async def admit(self) -> AsyncIterator[None]:
+        """
+        Hold a slot for the duration of the block, unless admission control is disabled.
+
+        Raises:
+            AdmissionRejected: No slot is free before the deadline.
+        """
+        if not self.enabled:
+            yield
+            return
+        await self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+    def guard(self, handler: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """
+        Run an agent handler under admission control, answering a rejection with :meth:`AdmissionRejected.response`.
+
+        The wrapper keeps the signature of ``handler``, so it can be bound to the session in its place.
+        """
+
+        @wraps(handler)
+        async def run(*args, **kwargs):
+            try:
+                async with self.admit():
+                    return await handler(*args, **kwargs)
+            except AdmissionRejected as e:
+                logger.warning(f"Rejected a {self.name} request: {e}")
+                return e.response()
+
+        return run
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "limit": self.limit,
+            "running": self._running,
+            "queue_depth": len(self._waiters),
+            "peak_queue_depth": self.peak_queue_depth,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_deadline": self.rejected_deadline,
+            "avg_run_seconds": round(self._run_seconds or 0.0, 3),
+        }
@@ -2,39 +2,22 @@ from typing import Annotated
 from uuid import UUID
 
 from genai_session.session import GenAISession
-from qdrant_client import models
+from langchain_core.prompts import PromptTemplate
 
+from src.agents.admission import AdmissionController
 from src.agents.agent_schema import AgentProperty
 from src.core.config import get_settings
-from src.services.qdrant.vector_db import Qdrant
+from src.services.qdrant.vector_db import vector_store
 
 settings = get_settings()
 session = GenAISession()
 
 agent_property = AgentProperty(session, UUID("e9dc5dbd-433e-4df8-ada1-cfda98440a66"))
 
+admission = AdmissionController("case_history_search", settings.CASE_HISTORY_CONCURRENCY)
 
-@session.bind(name="case_history_search", description="searching patient case history from vector database")
-async def get_current_date(agent_context, query: Annotated[str, "user query"]):
-    agent_context.logger.info("Inside case_history_search")
-    async with Qdrant(index_name=settings.QDRANT_COLLECTION) as vector_db:
-        retriever = vector_db.middle_ware.as_retriever(
-            search_kwargs={
-                "k": settings.MAX_RELEVANT_MATCHES,
-                "search_params": models.SearchParams(
-                    quantization=models.QuantizationSearchParams(
-                        ignore=False,
-                        rescore=True,
-                        oversampling=settings.OVERSAMPLING_FACTOR,
-                    )
-                ),
-            }
-        )
-        from langchain.tools.retriever import create_retriever_tool
-        from langchain_core.prompts import PromptTemplate
-
-        prompt = PromptTemplate.from_template(
-            """
+document_prompt = PromptTemplate.from_template(
+    """
 Department: {department}
 Patient History: {page_content}
 TreatmentGiven: {treatment_given}
@@ -44,19 +27,19 @@ Vitals: {vitals}
 ConsultantRecommendation: {consultant_recommendation}
 caseSummary: {case_summary}
 """
-        )
-
-        retriever_tool = create_retriever_tool(
-            retriever,
-            "retrieve_case_history",
-            "Search and return information about about patient history",
-            document_prompt=prompt,
-            document_separator="\n",
-        )
-        case_summary = retriever_tool.invoke({"query": query})
-        agent_context.logger.info(case_summary)
-        full_response = f"SimilarCase:\n{case_summary}"
-        return full_response
+)
+
+
+@session.bind(name="case_history_search", description="searching patient case history from vector database")
+@admission.guard
+async def get_current_date(agent_context, query: Annotated[str, "user query"]):
+    agent_context.logger.info("Inside case_history_search")
+    async with vector_store.borrow() as vector_db:
+        documents = await vector_db.asimilarity_search(query)
+        case_summary = await vector_db.aformat_documents(documents, document_prompt)
+    agent_context.logger.info(case_summary)
+    full_response = f"SimilarCase:\n{case_summary}"
+    return full_response
 
 
 async def main():
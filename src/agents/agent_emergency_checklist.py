@@ -4,11 +4,13 @@ from uuid import UUID
 from genai_session.session import GenAISession
 from langchain.output_parsers import PydanticOutputParser
 from langchain.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
 
+from src.agents.admission import AdmissionController
 from src.agents.agent_schema import AgentProperty
 from src.core.config import get_settings
+from src.services.llm.cache import ResponseCache
+from src.services.llm.registry import chain_registry
 
 settings = get_settings()
 session = GenAISession()
@@ -26,23 +28,23 @@ class EmergencyChecklist(BaseModel):
 
 # 2. Output parser and format instructions
 output_parser = PydanticOutputParser(pydantic_object=EmergencyChecklist)
-format_instructions = output_parser.get_format_instructions()
+JSON_GUIDANCE = """
+Return the entire response as a single JSON object with clearly defined keys corresponding to each section in the structured response above. Use arrays where multiple items are appropriate (e.g., checklist actions). Return the entire response as a single, well-formatted JSON object with clearly defined keys corresponding to each section in the structured response above. Use arrays of strings where multiple items are appropriate (e.g., checklist actions, interventions). Ensure all values are either strings or arrays of strings, and the JSON is properly structured."""
+format_instructions = f"{output_parser.get_format_instructions()}\n{JSON_GUIDANCE}"
 
 agent_property = AgentProperty(session, UUID("4d2c1223-6e60-4ee5-af6a-6831fd3245e2"))
 
+admission = AdmissionController("emergency_checklist", settings.EMERGENCY_CHECKLIST_CONCURRENCY)
 
-@session.bind(
-    name="emergency_checklist",
-    description="used to generate emergency checklist from patient case sheet and similar cases",
+response_cache = ResponseCache(
+    "emergency_checklist",
+    enabled=settings.LLM_CACHE_EMERGENCY_CHECKLIST,
+    semantic=settings.LLM_CACHE_SEMANTIC,
+    response_model=EmergencyChecklist,
 )
-async def get_current_date(
-    agent_context,
-    clinical_history: Annotated[str, "similar cases"],
-    patient_case_sheet: Annotated[str, "patient case sheet"],
-):
-    agent_context.logger.info("Inside emergency_checklist")
 
-    human_msg = """
+
+human_msg = """
 
 Instructions:
 
@@ -92,20 +94,42 @@ Focus on immediate emergency care and support for the treating physician.
 
 Output Format:
 {format_instructions}
-
-Return the entire response as a single JSON object with clearly defined keys corresponding to each section in the structured response above. Use arrays where multiple items are appropriate (e.g., checklist actions). Return the entire response as a single, well-formatted JSON object with clearly defined keys corresponding to each section in the structured response above. Use arrays of strings where multiple items are appropriate (e.g., checklist actions, interventions). Ensure all values are either strings or arrays of strings, and the JSON is properly structured.
 """
-    emergency_action_prompt = PromptTemplate(
-        template=human_msg, input_variables=["clinical_history", "patient_case_sheet", "format_instructions"]
-    )
-    llm = ChatOpenAI(model="gpt-4.1", temperature=0)
-    chain = emergency_action_prompt | llm | output_parser
-    chain_response = await chain.ainvoke(
+emergency_action_prompt = PromptTemplate(
+    template=human_msg, input_variables=["clinical_history", "patient_case_sheet", "format_instructions"]
+)
+chain_registry.register(
+    "emergency_checklist",
+    lambda: chain_registry.structured(
+        "emergency_checklist",
+        emergency_action_prompt,
+        chain_registry.model("gpt-4.1"),
+        output_parser,
+        format_instructions,
+    ),
+)
+
+
+@session.bind(
+    name="emergency_checklist",
+    description="used to generate emergency checklist from patient case sheet and similar cases",
+)
+@admission.guard
+async def get_current_date(
+    agent_context,
+    clinical_history: Annotated[str, "similar cases"],
+    patient_case_sheet: Annotated[str, "patient case sheet"],
+):
+    agent_context.logger.info("Inside emergency_checklist")
+
+    chain = chain_registry.get("emergency_checklist")
+    chain_response = await response_cache.ainvoke(
+        chain,
         {
             "clinical_history": clinical_history,
             "patient_case_sheet": patient_case_sheet,
-            "format_instructions": format_instructions,
-        }
+        },
+        similarity_text=patient_case_sheet,
     )
     print(chain_response)
     return chain_response.model_dump_json()
@@ -1,24 +1,26 @@
-import io
-import json
-from pathlib import Path
 from typing import Annotated, Literal
 from uuid import UUID
 
-import aiofiles
 from genai_session.session import GenAISession
 from langchain.output_parsers import PydanticOutputParser
 from langchain.prompts import PromptTemplate
-from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
 
+from src.agents.admission import AdmissionController
 from src.agents.agent_schema import AgentProperty
 from src.core.config import get_settings
+from src.services.llm.registry import chain_registry
+from src.services.resources.allocator import allocate
+from src.services.resources.context import prompt_context
+from src.services.resources.store import resource_store
 
 settings = get_settings()
 session = GenAISession()
 
 agent_property = AgentProperty(session, UUID("df0bfed8-21ea-4240-b2d6-50030a6fdfec"))
 
+admission = AdmissionController("resource_availability_check", settings.RESOURCE_CHECK_CONCURRENCY)
+
 
 class Resource(BaseModel):
     type: Literal["bed", "stretcher"]
@@ -33,29 +35,16 @@ class ResourceAvailability(BaseModel):
     suggested_hospital: str
 
 
-output_parser = PydanticOutputParser(pydantic_object=ResourceAvailability)
-format_instructions = output_parser.get_format_instructions()
+class ReservedResourceAvailability(ResourceAvailability):
+    """Rule-based decision, carrying the reservation that holds the assigned resource until the admission completes."""
 
+    reservation_id: str | None = None
 
-@session.bind(name="resource_availability_check", description="used to check hospital resource and travel assistance")
-async def get_current_date(agent_context, emergency_sheet: Annotated[str, "patient emergency sheet case sheet"]):
-    agent_context.logger.info("Inside resource_availability_check")
 
-    async with aiofiles.open(
-        Path(__file__).parent.parent / "models/data/hospital_details.json",
-        "rb",
-    ) as json_file:
-        file_data = await json_file.read()
-        hospital_list = json.load(io.BytesIO(file_data))
+output_parser = PydanticOutputParser(pydantic_object=ResourceAvailability)
 
-    async with aiofiles.open(
-        Path(__file__).parent.parent / "models/data/resource_availability.json",
-        "rb",
-    ) as json_file:
-        file_data = await json_file.read()
-        resource_availability = json.load(io.BytesIO(file_data))
 
-        human_msg = """
+human_msg = """
 
 ### ROLE
 You are a hospital operations assistant responsible for managing emergency patient admissions. Based on the inputs provided below, determine if the patient can be admitted to the current hospital.
@@ -78,22 +67,40 @@ Do not make up any hospitals or departments not present in the input. Work only
 Output Format:
 {format_instructions}
 """
-        emergency_action_prompt = PromptTemplate(
-            template=human_msg,
-            input_variables=["resource_availability", "hospital_list", "emergency_sheet", "format_instructions"],
-        )
-        llm = ChatOpenAI(model="gpt-4.1", temperature=0)
-        chain = emergency_action_prompt | llm | output_parser
-        chain_response = await chain.ainvoke(
-            {
-                "resource_availability": resource_availability,
-                "hospital_list": hospital_list,
-                "emergency_sheet": emergency_sheet,
-                "format_instructions": format_instructions,
-            }
-        )
-        print(chain_response)
-        return chain_response.model_dump_json()
+emergency_action_prompt = PromptTemplate(
+    template=human_msg,
+    input_variables=["resource_availability", "hospital_list", "emergency_sheet", "format_instructions"],
+)
+chain_registry.register(
+    "resource_availability_check",
+    lambda: chain_registry.structured(
+        "resource_availability_check", emergency_action_prompt, chain_registry.model("gpt-4.1"), output_parser
+    ),
+)
+
+
+@session.bind(name="resource_availability_check", description="used to check hospital resource and travel assistance")
+@admission.guard
+async def get_current_date(agent_context, emergency_sheet: Annotated[str, "patient emergency sheet case sheet"]):
+    agent_context.logger.info("Inside resource_availability_check")
+
+    store = await resource_store.refresh()
+    if settings.RULE_BASED_ALLOCATION and (allocation := await allocate(store, emergency_sheet)) is not None:
+        return ReservedResourceAvailability(**allocation).model_dump_json()
+
+    agent_context.logger.info("Department not resolved, leaving the allocation to the LLM")
+    context = prompt_context(store, "resource_availability_check", emergency_sheet)
+
+    chain = chain_registry.get("resource_availability_check")
+    chain_response = await chain.ainvoke(
+        {
+            "resource_availability": context["resource_availability"],
+            "hospital_list": context["hospital_list"],
+            "emergency_sheet": emergency_sheet,
+        }
+    )
+    print(chain_response)
+    return chain_response.model_dump_json()
 
 
 async def main():
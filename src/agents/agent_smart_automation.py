@@ -1,25 +1,51 @@
-import io
+import asyncio
+import hashlib
 import json
-from pathlib import Path
-from typing import Annotated, Literal
+import logging
+import uuid
+import weakref
+from contextlib import asynccontextmanager, nullcontext
+from functools import lru_cache, wraps
+from typing import Annotated, AsyncIterator, Literal, Optional, Tuple
 from uuid import UUID
 
-import aiofiles
 from genai_session.session import GenAISession
 from langchain.output_parsers import PydanticOutputParser
 from langchain.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import RunnableConfig
 from langgraph.graph import END, START, StateGraph
 from pydantic import BaseModel, Field
 from typing_extensions import TypedDict
 
+from src.agents.admission import AdmissionController, AdmissionRejected, raise_if_rejected
 from src.agents.agent_schema import AgentProperty
-
+from src.agents.dispatch import local_dispatcher
+from src.agents.speculation import Speculator
+from src.core.config import get_settings
+from src.services.checkpoint.sqlite import checkpoint_stats, workflow_checkpointer
+from src.services.llm.cache import ResponseCache
+from src.services.llm.registry import chain_registry
+from src.services.llm.scheduler import llm_priority
+from src.services.llm.streaming import stream_text
+from src.services.resources.context import prompt_context
+from src.services.resources.ledger import reservation_ledger
+from src.services.resources.store import resource_store
+
+settings = get_settings()
 session = GenAISession()
 
+logger = logging.getLogger(__name__)
+
 agent_property = AgentProperty(session, UUID("fa94c912-c6e4-4af4-a5e4-a3af4aaab109"))
 
+case_history_prefetch = Speculator("case history search")
+
+# one lock per case sheet in flight, dropped once no run of the sheet holds it
+_workflow_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+admission = AdmissionController("smart_automation", settings.SMART_AUTOMATION_CONCURRENCY)
+
 
 class Sheet(TypedDict):
     history: str
@@ -34,6 +60,37 @@ class Sheet(TypedDict):
     appointment_details: str
 
 
+TRIAGE_DECISION_RULES = """### DECISION RULES
+    (Apply the most severe rule that matches; if several match, pick the highest‑priority colour.)
+
+    **HighRisk (Immediate)**
+    • Patient is **unconscious**  or  **confused**
+    • ECG shows **ventricular fibrillation**  or **ST depression**
+    • Blood pressure: systolic<90mmHg **OR** diastolic<60mmHg
+    • Vitals explicitly described as **unstable**
+    • Described **pain** or **chest pain**
+
+    **LowRisk (Non‑urgent)**
+    • None of the HighRisk conditions apply
+    • ECG described as **normal**
+    • Symptoms limited to **mild headache** or request for **routine check‑up**
+    • Vitals explicitly described as **stable**"""
+
+LOW_RISK_CHECKLIST = """
+Patient Details
+Presenting Complaint
+	"""
+
+HIGH_RISK_CHECKLIST = """
+Patient Details
+Medical History
+Current medications
+Vital Signs
+"""
+
+TIMEOUT_FALLBACK_RESPONSE = "The case sheet could not be assessed in time, please resubmit it in a few seconds."
+
+
 class TriageResponse(BaseModel):
     criticality: Literal["HighRisk", "LowRisk"]
 
@@ -45,46 +102,26 @@ class VerificationResponse(BaseModel):
     )
 
 
-def triage_selection(state):
-    """
-    Triage patients into high-risk or low-risk zones based on defined decision rules
-    from a free-text patient note. Utilizes a prompt-based approach with language
-    model and structured output parsing.
+class TriageVerificationResponse(BaseModel):
+    # the fields are declared in the order the model works through them: triage first, then verification
+    criticality: Literal["HighRisk", "LowRisk"]
+    verified: Literal["yes", "no"]
+    fallback_response: str | None = Field(
+        None, description="fallback text if user not submitted full information give proper instructions to resubmit"
+    )
 
-    :param state: A dictionary containing input data. The "sheet" key in the dictionary
-        should hold the patient's free-text note as a string.
-    :type state: dict
-    :return: A dictionary indicating the criticality level of the patient as
-        determined by the triage process. The returned dictionary has a key
-        "criticality" which maps to a string value ("HighRisk" or "LowRisk").
-    :rtype: dict
-    """
-    output_parser = PydanticOutputParser(pydantic_object=TriageResponse)
-    format_instructions = output_parser.get_format_instructions()
 
-    triage_prompt = PromptTemplate(
-        template="""
+triage_output_parser = PydanticOutputParser(pydantic_object=TriageResponse)
+
+triage_prompt = PromptTemplate(
+    template="""
     ### ROLE
     You are an experienced emergency‑room triage nurse.
 
     ### TASK
     From the free‑text patient note provided, decide whether the patient belongs in the **HighRisk**, or **LowRisk** triage zone.
 
-    ### DECISION RULES
-    (Apply the most severe rule that matches; if several match, pick the highest‑priority colour.)
-
-    **HighRisk (Immediate)**
-    • Patient is **unconscious**  or  **confused**
-    • ECG shows **ventricular fibrillation**  or **ST depression**
-    • Blood pressure: systolic<90mmHg **OR** diastolic<60mmHg
-    • Vitals explicitly described as **unstable**
-    • Described **pain** or **chest pain**
-
-    **LowRisk (Non‑urgent)**
-    • None of the HighRisk conditions apply
-    • ECG described as **normal**
-    • Symptoms limited to **mild headache** or request for **routine check‑up**
-    • Vitals explicitly described as **stable**
+    {decision_rules}
 
        **ResponseFormat**
         {format_instructions}
@@ -94,19 +131,42 @@ def triage_selection(state):
     {user_query}
     >>>
     """,
-        input_variables=["user_query", "format_instructions"],
-    )
+    input_variables=["user_query"],
+    partial_variables={"decision_rules": TRIAGE_DECISION_RULES},
+)
 
-    llm = ChatOpenAI(model="gpt-4.1-nano", temperature=0)
+chain_registry.register(
+    "triage",
+    lambda: chain_registry.structured(
+        "triage", triage_prompt, chain_registry.model("gpt-4.1-nano", settings.LLM_TIMEOUT), triage_output_parser
+    ),
+)
 
-    triage_chain = triage_prompt | llm | output_parser
 
-    response = triage_chain.invoke(
-        {
-            "user_query": state["sheet"],
-            "format_instructions": format_instructions,
-        }
-    )
+async def triage_selection(state):
+    """
+    Triage patients into high-risk or low-risk zones based on defined decision rules
+    from a free-text patient note. Utilizes a prompt-based approach with language
+    model and structured output parsing. The model is awaited without blocking the
+    event loop and the call is abandoned after ``LLM_TIMEOUT`` seconds.
+
+    :param state: A dictionary containing input data. The "sheet" key in the dictionary
+        should hold the patient's free-text note as a string.
+    :type state: dict
+    :return: A dictionary indicating the criticality level of the patient as
+        determined by the triage process. The returned dictionary has a key
+        "criticality" which maps to a string value ("HighRisk" or "LowRisk").
+    :rtype: dict
+    :raises TimeoutError: If the model does not answer within ``LLM_TIMEOUT`` seconds.
+    """
+    triage_chain = chain_registry.get("triage")
+
+    async with asyncio.timeout(settings.LLM_TIMEOUT):
+        response = await triage_chain.ainvoke(
+            {
+                "user_query": state["sheet"],
+            }
+        )
     return {"criticality": response.criticality}
 
 
@@ -123,10 +183,7 @@ def green_list(state):
     :return: The updated dictionary with the added "checklist" key and its associated content.
     :rtype: dict
     """
-    state["checklist"] = """
-Patient Details
-Presenting Complaint
-	"""
+    state["checklist"] = LOW_RISK_CHECKLIST
     return state
 
 
@@ -143,20 +200,48 @@ def red_list(state):
         the "checklist" key.
     :rtype: dict
     """
-    state["checklist"] = """
-Patient Details
-Medical History
-Current medications
-Vital Signs
-"""
+    state["checklist"] = HIGH_RISK_CHECKLIST
     return state
 
 
-def verification(state):
+verification_output_parser = PydanticOutputParser(pydantic_object=VerificationResponse)
+
+verification_prompt = PromptTemplate(
+    template="""
+    Please review the submitted case summary.
+
+    Patient Case Summary:
+    {user_query}
+
+    CheckList:
+    {checklist_items}
+
+    verify the checklist items are fulfilled for case sheet.
+
+   **ResponseFormat**
+    {format_instructions}
+
+    """,
+    input_variables=["checklist_items", "risk_level", "user_query"],
+)
+
+chain_registry.register(
+    "verification",
+    lambda: chain_registry.structured(
+        "verification",
+        verification_prompt,
+        chain_registry.model("gpt-4.1-nano", settings.LLM_TIMEOUT),
+        verification_output_parser,
+    ),
+)
+
+
+async def verification(state):
     """
     Performs verification of a given patient's case summary based on submitted state information. The process involves
     utilizing a language model to assess the provided data and determine missing or incomplete information, requiring
     further submission for final evaluation. The function applies specific formatting and templates for accurate results.
+    The model is awaited without blocking the event loop and the call is abandoned after ``LLM_TIMEOUT`` seconds.
 
     :param state: A dictionary containing the state of the patient's case summary, which includes:
         - checklist (str): The items required for verification.
@@ -165,71 +250,148 @@ def verification(state):
     :return: Updated state dictionary with the verification result. Specifically:
         - verified (bool): Indicates whether the submitted case sheet meets the requirements.
         - fallback_response (str): Provides additional output or guidance in case of incomplete verification.
+    :raises TimeoutError: If the model does not answer within ``LLM_TIMEOUT`` seconds.
     """
-    output_parser_2 = PydanticOutputParser(pydantic_object=VerificationResponse)
-    format_instructions = output_parser_2.get_format_instructions()
+    verification_chain = chain_registry.get("verification")
+    async with asyncio.timeout(settings.LLM_TIMEOUT):
+        response = await verification_chain.ainvoke(
+            {
+                "checklist_items": state["checklist"],
+                "risk_level": state["criticality"],
+                "user_query": state["sheet"],
+            }
+        )
+    state["verified"] = response.verified
+    state["fallback_response"] = response.fallback_response
+    return state
 
-    verification_prompt = PromptTemplate(
-        template="""
-    Please review the submitted case summary.
 
-    Patient Case Summary:
-    {user_query}
+triage_verification_output_parser = PydanticOutputParser(pydantic_object=TriageVerificationResponse)
 
-    CheckList:
-    {checklist_items}
+triage_verification_prompt = PromptTemplate(
+    template="""
+    ### ROLE
+    You are an experienced emergency‑room triage nurse.
 
-    verify the checklist items are fulfilled for case sheet.
+    ### TASK
+    1. From the free‑text patient note provided, decide whether the patient belongs in the **HighRisk**, or **LowRisk** triage zone.
+    2. Review the patient note against the checklist of the zone you chose and verify the checklist items are fulfilled.
+       If they are not, explain in the fallback response what is missing and how to resubmit.
 
-   **ResponseFormat**
-    {format_instructions}
+    {decision_rules}
 
+    ### CHECKLISTS
+    **HighRisk**
+    {high_risk_checklist}
+
+    **LowRisk**
+    {low_risk_checklist}
+
+       **ResponseFormat**
+        {format_instructions}
+
+    ### PATIENT NOTE
+    <<<
+    {user_query}
+    >>>
     """,
-        input_variables=["checklist_items", "format_instructions", "risk_level", "user_query"],
-    )
+    input_variables=["user_query"],
+    partial_variables={
+        "decision_rules": TRIAGE_DECISION_RULES,
+        "high_risk_checklist": HIGH_RISK_CHECKLIST,
+        "low_risk_checklist": LOW_RISK_CHECKLIST,
+    },
+)
 
-    llm = ChatOpenAI(model="gpt-4.1-nano", temperature=0)
+chain_registry.register(
+    "triage_verification",
+    lambda: chain_registry.structured(
+        "triage_verification",
+        triage_verification_prompt,
+        chain_registry.model("gpt-4.1-nano", settings.LLM_TIMEOUT),
+        triage_verification_output_parser,
+    ),
+)
+
+
+async def triage_verification(state):
+    """
+    Triages the patient and verifies the case sheet in a single model call. The verification
+    checklist only depends on the triage zone, so both checklists are given to the model, which
+    picks the zone and verifies the sheet against that zone's checklist in one structured
+    response. Used instead of the ``TriageAgent`` and ``Verification`` nodes when
+    ``FUSED_TRIAGE_VERIFICATION`` is enabled, removing one round trip from every request.
 
-    verification_chain = verification_prompt | llm | output_parser_2
-    response = verification_chain.invoke(
-        {
-            "checklist_items": state["checklist"],
-            "risk_level": state["criticality"],
-            "format_instructions": format_instructions,
-            "user_query": state["sheet"],
-        }
+    :param state: A dictionary whose "sheet" key holds the patient's free-text note.
+    :type state: dict
+    :return: A dictionary with the "criticality", "checklist", "verified" and
+        "fallback_response" keys, as set by the separate triage and verification nodes.
+    :rtype: dict
+    :raises TimeoutError: If the model does not answer within ``LLM_TIMEOUT`` seconds.
+    """
+    triage_verification_chain = chain_registry.get("triage_verification")
+
+    async with asyncio.timeout(settings.LLM_TIMEOUT):
+        response = await triage_verification_chain.ainvoke(
+            {
+                "user_query": state["sheet"],
+            }
+        )
+    return {
+        "criticality": response.criticality,
+        "checklist": HIGH_RISK_CHECKLIST if response.criticality == "HighRisk" else LOW_RISK_CHECKLIST,
+        "verified": response.verified,
+        "fallback_response": response.fallback_response,
+    }
+
+
+async def fetch_case_history(sheet):
+    """
+    Retrieves similar historical cases for a case sheet from the case history agent, called
+    in-process when this worker hosts it.
+
+    :param sheet: The patient's free-text case sheet used as the search query.
+    :type sheet: str
+    :return: The similar cases as returned by the agent.
+    :rtype: str
+    :raises AdmissionRejected: If the agent is at capacity.
+    """
+    agent_response = await local_dispatcher.send(
+        session, message={"query": sheet}, client_id="e9dc5dbd-433e-4df8-ada1-cfda98440a66"
     )
-    state["verified"] = response.verified
-    state["fallback_response"] = response.fallback_response
-    return state
+    return raise_if_rejected(agent_response.response)
 
 
-async def search_case_history(state):
+async def search_case_history(state, config: RunnableConfig):
     """
     Searches the case history based on the provided state and updates the state with
     the retrieved history.
 
-    This asynchronous function communicates with an external agent to retrieve
+    This asynchronous function communicates with the case history agent to retrieve
     case history data corresponding to the `sheet` key in the provided `state`.
     The retrieved history is then stored in the `history` key of the `state`.
+    When the lookup was started speculatively for this run (``SPECULATIVE_CASE_HISTORY``),
+    its result is awaited instead of sending a new request.
 
     :param state: A dictionary containing the current state, including a "sheet" key
         that specifies the query to retrieve history.
     :type state: dict
+    :param config: The run configuration, whose "speculation_id" identifies the prefetch.
+    :type config: RunnableConfig
     :return: Updated state with history retrieved from the agent.
     :rtype: dict
     """
-    agent_response = await session.send(
-        message={"query": state["sheet"]}, client_id="e9dc5dbd-433e-4df8-ada1-cfda98440a66"
+    state["history"] = await case_history_prefetch.take(
+        config["configurable"].get("speculation_id"), lambda: fetch_case_history(state["sheet"])
     )
-    state["history"] = agent_response.response
     return state
 
 
 async def emergency_action_list(state):
     """
-    Executes an asynchronous action by sending clinical history and patient case sheet to a
-    specific client and updates the state with the received emergency actions.
+    Executes an asynchronous action by sending clinical history and patient case sheet to the
+    emergency checklist agent, called in-process when this worker hosts it, and updates the
+    state with the received emergency actions.
 
     :param state: Dictionary containing the patient data. Must include "history" and "sheet"
                   keys used for generating the message and performing the operation.
@@ -237,12 +399,14 @@ async def emergency_action_list(state):
 
     :return: Updated state dictionary including the emergency actions fetched from the agent.
     :rtype: dict
+    :raises AdmissionRejected: If the agent is at capacity.
     """
-    agent_response = await session.send(
+    agent_response = await local_dispatcher.send(
+        session,
         message={"clinical_history": state["history"], "patient_case_sheet": state["sheet"]},
         client_id="4d2c1223-6e60-4ee5-af6a-6831fd3245e2",
     )
-    state["actions"] = json.loads(agent_response.response)
+    state["actions"] = json.loads(raise_if_rejected(agent_response.response))
     return state
 
 
@@ -250,8 +414,8 @@ async def check_resource_availability(state):
     """
     Checks the availability of a resource and updates the state with the resource allocation.
 
-    This function sends a request containing emergency sheet information to a specified
-    agent and waits for the response. The received response is then parsed and added to
+    This function sends a request containing emergency sheet information to the resource
+    availability agent, called in-process when this worker hosts it, and waits for the response. The received response is then parsed and added to
     the provided state dictionary under the "resource_allocation" key.
 
     :param state: A dictionary containing the current state of the resource and actions
@@ -259,26 +423,16 @@ async def check_resource_availability(state):
     :type state: dict
     :return: Updated state with the resource allocation information.
     :rtype: dict
+    :raises AdmissionRejected: If the agent is at capacity.
     """
-    agent_response = await session.send(
-        message={"emergency_sheet": state["actions"]}, client_id="df0bfed8-21ea-4240-b2d6-50030a6fdfec"
+    agent_response = await local_dispatcher.send(
+        session, message={"emergency_sheet": state["actions"]}, client_id="df0bfed8-21ea-4240-b2d6-50030a6fdfec"
     )
-    state["resource_allocation"] = json.loads(agent_response.response)
+    state["resource_allocation"] = json.loads(raise_if_rejected(agent_response.response))
     return state
 
 
-async def generate_summary(state):
-    """
-    Generates a structured clinical handover summary for a newly admitted patient based on provided resource allocation
-    and action data. The summary includes sections such as Presenting Complaint, Assessment, Current Status, and Plan.
-
-    :param state: A dictionary containing resource allocation and actions. The expected format:
-                  - "resource_allocation" (str): Data about resource assignments (e.g., admission status, bed assignment).
-                  - "actions" (str): Clinical actions and assessments that need to be documented.
-    :return: A dictionary with the updated "handover_summary" entry containing the generated clinical handover summary.
-
-    """
-    human_msg = """
+summary_template = """
 You are to generate a structured, well-formatted clinical handover summary for a newly admitted patient, using the following information:
 [ResourceAllocated]
 {resource_allocation}
@@ -315,30 +469,42 @@ Use bullet points where appropriate for readability.
 Be concise but comprehensive, suitable for handover to another clinician.
     """
 
-    emergency_action_prompt = PromptTemplate(template=human_msg, input_variables=["resource_allocation", "actions"])
+summary_prompt = PromptTemplate(template=summary_template, input_variables=["resource_allocation", "actions"])
+# exact matches only: similar allocations still differ in the bed and doctor the summary must name
+summary_cache = ResponseCache("handover_summary", enabled=settings.LLM_CACHE_HANDOVER_SUMMARY)
+chain_registry.register(
+    "handover_summary", lambda: summary_prompt | chain_registry.model("gpt-4.1") | StrOutputParser()
+)
+
 
-    llm = ChatOpenAI(model="gpt-4.1", temperature=0)
-    chain = emergency_action_prompt | llm | StrOutputParser()
-    chain_response = await chain.ainvoke(
-        {
-            "resource_allocation": state["resource_allocation"],
-            "actions": state["actions"],
-        }
+async def generate_summary(state):
+    """
+    Generates a structured clinical handover summary for a newly admitted patient based on provided resource allocation
+    and action data. The summary includes sections such as Presenting Complaint, Assessment, Current Status, and Plan.
+    The handover completes the admission, so the reservation of the assigned resource is then confirmed and held until
+    the patient is discharged.
+
+    :param state: A dictionary containing resource allocation and actions. The expected format:
+                  - "resource_allocation" (str): Data about resource assignments (e.g., admission status, bed assignment).
+                  - "actions" (str): Clinical actions and assessments that need to be documented.
+    :return: A dictionary with the updated "handover_summary" entry containing the generated clinical handover summary.
+
+    """
+    chain = chain_registry.get("handover_summary")
+    # reservation ids are unique per admission and never change the summary
+    allocation = {key: value for key, value in state["resource_allocation"].items() if key != "reservation_id"}
+    chain_response = await stream_text(
+        "handover_summary",
+        summary_cache.astream(chain, {"resource_allocation": allocation, "actions": state["actions"]}),
     )
+    reservation_id = state["resource_allocation"].get("reservation_id")
+    if reservation_id and not await reservation_ledger.confirm(reservation_id):
+        logger.warning(f"Reservation {reservation_id} expired before the handover, its resource may be reassigned")
     state["handover_summary"] = chain_response
-    print(chain_response)
     return state
 
 
-async def doctor_appointment(state):
-    async with aiofiles.open(
-        Path(__file__).parent.parent / "models/data/resource_availability.json",
-        "rb",
-    ) as json_file:
-        file_data = await json_file.read()
-        resource_availability = json.load(io.BytesIO(file_data))
-    llm = ChatOpenAI(model="gpt-4.1", temperature=0)
-    human_msg = """
+appointment_template = """
 You are provided with a patient case sheet containing relevant clinical and demographic information. Based on this, generate a structured and professional doctor appointment creation note. Your output should be formatted for use in a hospital or clinic setting.
 
 Output Structure:
@@ -356,29 +522,258 @@ ResourceAvailable:
 Presenting Complaint:
 {case_sheet}
     """
-    appointment_action_prompt = PromptTemplate(template=human_msg, input_variables=["resource_allocation", "actions"])
-    chain = appointment_action_prompt | llm | StrOutputParser()
-    chain_response = await chain.ainvoke(
-        {
-            "resource_available": resource_availability,
-            "case_sheet": state["sheet"],
-        }
+appointment_action_prompt = PromptTemplate(
+    template=appointment_template, input_variables=["resource_allocation", "actions"]
+)
+chain_registry.register(
+    "doctor_appointment",
+    lambda: appointment_action_prompt | chain_registry.model("gpt-4.1") | StrOutputParser(),
+)
+
+
+async def doctor_appointment(state):
+    context = prompt_context(await resource_store.refresh(), "doctor_appointment", state["sheet"], hospitals=False)
+    chain = chain_registry.get("doctor_appointment")
+    chain_response = await stream_text(
+        "doctor_appointment",
+        chain.astream(
+            {
+                "resource_available": context["resource_availability"],
+                "case_sheet": state["sheet"],
+            }
+        ),
     )
     state["appointment_details"] = chain_response
     return state
 
 
+def select_zone(state, config: RunnableConfig):
+    if state["criticality"] == "LowRisk":
+        # LowRisk cases never search the case history, stop the speculative lookup right away
+        case_history_prefetch.discard(config["configurable"].get("speculation_id"))
+    return state["criticality"]
+
+
+def continue_graph(state, config: RunnableConfig):
+    if state["verified"] == "yes":
+        if state["criticality"] == "LowRisk":
+            case_history_prefetch.discard(config["configurable"].get("speculation_id"))
+            return "Appointment"
+        return "PreviousCaseHistory"
+    else:
+        case_history_prefetch.discard(config["configurable"].get("speculation_id"))
+        return END
+
+
+def route(state):
+    if state["resource_allocation"]["admission_status"] == "Accepted":
+        return "Summary"
+    else:
+        return END
+
+
+def prioritized(node):
+    """
+    Wraps a graph node so the OpenAI requests it makes are scheduled by the criticality that
+    triage gave the case.
+
+    :param node: The async graph node, taking the state and optionally the run config.
+    :return: The wrapped node, with the signature of ``node``.
+    """
+
+    @wraps(node)
+    async def run(state, *args, **kwargs):
+        with llm_priority(state.get("criticality")):
+            return await node(state, *args, **kwargs)
+
+    return run
+
+
+@lru_cache
+def get_graph():
+    """
+    Builds and compiles the smart automation state graph on first use and returns the same compiled graph
+    afterwards. The graph holds no per-request state, so one instance serves every case sheet.
+
+    With ``FUSED_TRIAGE_VERIFICATION`` enabled, a single ``TriageVerification`` node replaces the
+    ``TriageAgent`` -> ``LowRisk``/``HighRisk`` -> ``Verification`` path. With
+    ``WORKFLOW_CHECKPOINTING`` enabled, the graph checkpoints every step of a run in the SQLite
+    checkpointer, under the thread id of the case sheet.
+
+    :return: The compiled state graph.
+    :rtype: CompiledStateGraph
+    """
+    ag_builder = StateGraph(Sheet)
+    ag_builder.add_node("ResourceAvailability", prioritized(check_resource_availability))
+    ag_builder.add_node("Appointment", prioritized(doctor_appointment))
+    ag_builder.add_node("Emergency", prioritized(emergency_action_list))
+    ag_builder.add_node("PreviousCaseHistory", prioritized(search_case_history))
+    ag_builder.add_node("Summary", prioritized(generate_summary))
+
+    if settings.FUSED_TRIAGE_VERIFICATION:
+        ag_builder.add_node("TriageVerification", triage_verification)
+        ag_builder.add_edge(START, "TriageVerification")
+        ag_builder.add_conditional_edges(
+            "TriageVerification", continue_graph, ["PreviousCaseHistory", "Appointment", END]
+        )
+    else:
+        ag_builder.add_node("TriageAgent", triage_selection)
+        ag_builder.add_node("LowRisk", green_list)
+        ag_builder.add_node("HighRisk", red_list)
+        ag_builder.add_node("Verification", prioritized(verification))
+        ag_builder.add_edge(START, "TriageAgent")
+        ag_builder.add_conditional_edges("TriageAgent", select_zone, ["LowRisk", "HighRisk"])
+        ag_builder.add_edge("LowRisk", "Verification")
+        ag_builder.add_edge("HighRisk", "Verification")
+        ag_builder.add_conditional_edges("Verification", continue_graph, ["PreviousCaseHistory", "Appointment", END])
+    ag_builder.add_edge("PreviousCaseHistory", "Emergency")
+    ag_builder.add_edge("Emergency", "ResourceAvailability")
+    ag_builder.add_conditional_edges("ResourceAvailability", route, ["Summary", END])
+    ag_builder.add_edge("Summary", END)
+    return ag_builder.compile(checkpointer=workflow_checkpointer.get() if settings.WORKFLOW_CHECKPOINTING else None)
+
+
+def workflow_thread_id(case_sheet: str, patient_id: str = "") -> str:
+    """
+    Content address of a case sheet, used as the thread id its runs are checkpointed under.
+    Whitespace is normalized, so a resubmission that only differs in line breaks or spacing
+    maps to the same thread, and the graph variant is part of the hash, so checkpoints of the
+    fused and the staged graph never mix. The patient the sheet was submitted for is part of it
+    too, so identical sheets of two patients never share a run, nor the bed it reserved.
+
+    :param case_sheet: The patient case sheet.
+    :type case_sheet: str
+    :param patient_id: Who the sheet was submitted for, empty when unknown.
+    :type patient_id: str
+    :return: The hex digest of the patient and the normalized sheet.
+    :rtype: str
+    """
+    normalized = " ".join(case_sheet.split())
+    variant = "fused" if settings.FUSED_TRIAGE_VERIFICATION else "staged"
+    return hashlib.sha256(f"smart_automation:{variant}:{patient_id}:{normalized}".encode()).hexdigest()
+
+
+@asynccontextmanager
+async def workflow_config(case_sheet: str, patient_id: str = "") -> AsyncIterator[RunnableConfig]:
+    """
+    Yields the config to run the graph with for one case sheet. With ``WORKFLOW_CHECKPOINTING``
+    enabled, runs of the same sheet are serialized, so a resubmission waits for the run in
+    progress and then finds its checkpoint. Whatever speculative work the graph did not take
+    is cancelled on exit.
+
+    :param case_sheet: The patient case sheet the graph runs on.
+    :type case_sheet: str
+    :param patient_id: Who the sheet was submitted for, empty when unknown.
+    :type patient_id: str
+    :return: The run config, holding the thread id and the speculation id under ``configurable``.
+    :rtype: RunnableConfig
+    """
+    thread_id = workflow_thread_id(case_sheet, patient_id)
+    speculation_id = uuid.uuid4().hex
+    lock = _workflow_locks.get(thread_id)
+    if lock is None:
+        lock = _workflow_locks[thread_id] = asyncio.Lock()
+    try:
+        async with lock if settings.WORKFLOW_CHECKPOINTING else nullcontext():
+            yield {"configurable": {"thread_id": thread_id, "speculation_id": speculation_id}}
+    finally:
+        case_history_prefetch.discard(speculation_id)
+
+
+async def workflow_input(case_sheet: str, config: RunnableConfig) -> Tuple[Optional[dict], Optional[dict]]:
+    """
+    Decides how to run the graph on a case sheet under a config from ``workflow_config``.
+
+    With ``WORKFLOW_CHECKPOINTING`` enabled the checkpoint of the sheet is looked up first:
+    when a run of the same sheet completed within ``WORKFLOW_CHECKPOINT_TTL`` its final state is
+    returned and the graph is not run again, and when a run stopped part way the graph resumes
+    it from its last completed node, so a resubmission keeps the bed or stretcher its run
+    reserved. When that reservation was released or expired since, the graph resumes from the
+    resource allocation instead, reusing the clinical assessment. Otherwise the graph starts
+    afresh, and with ``SPECULATIVE_CASE_HISTORY`` enabled the case history lookup starts right
+    away.
+
+    :param case_sheet: The patient case sheet the graph runs on.
+    :type case_sheet: str
+    :param config: The run config.
+    :type config: RunnableConfig
+    :return: The input to run the graph with, None to resume the checkpointed run, and the
+        final state of a completed run, None when the graph has to run.
+    :rtype: tuple
+    """
+    if settings.WORKFLOW_CHECKPOINTING:
+        snapshot = await get_graph().aget_state(config)
+        reservation_id = (snapshot.values.get("resource_allocation") or {}).get("reservation_id")
+        if reservation_id and reservation_ledger.held(reservation_id) is None:
+            # the patient was discharged, or the admission never completed, so the resource may be someone else's now
+            await get_graph().aupdate_state(config, None, as_node="Emergency")
+            checkpoint_stats.resumed += 1
+            return None, None
+        if snapshot.values and not snapshot.next:
+            checkpoint_stats.hits += 1
+            return None, snapshot.values
+        if snapshot.next:
+            checkpoint_stats.resumed += 1
+            return None, None
+        checkpoint_stats.misses += 1
+    if settings.SPECULATIVE_CASE_HISTORY:
+        case_history_prefetch.start(config["configurable"]["speculation_id"], fetch_case_history(case_sheet))
+    return {"sheet": case_sheet}, None
+
+
+async def run_workflow(case_sheet: str, patient_id: str = "") -> dict:
+    """
+    Runs the graph on a case sheet, or takes the result of an earlier run of the same sheet
+    for the same patient from its checkpoint.
+
+    :param case_sheet: The patient case sheet.
+    :type case_sheet: str
+    :param patient_id: Who the sheet was submitted for, empty when unknown.
+    :type patient_id: str
+    :return: The final state of the graph.
+    :rtype: dict
+    """
+    async with workflow_config(case_sheet, patient_id) as config:
+        inputs, response = await workflow_input(case_sheet, config)
+        if response is None:
+            response = await get_graph().ainvoke(inputs, config)
+    return response
+
+
+def workflow_result(response: dict):
+    """
+    Picks the outcome of a graph run out of its final state.
+
+    :param response: The final state of the graph.
+    :type response: dict
+    :return: The fallback response when verification failed, the appointment details of a
+        verified LowRisk case, the resource allocation when the patient was not accepted,
+        and the handover summary otherwise.
+    """
+    if response["verified"] == "no":
+        return response["fallback_response"]
+    elif response["verified"] == "yes" and response["criticality"] == "LowRisk":
+        return response["appointment_details"]
+    elif response["resource_allocation"]["admission_status"] != "Accepted":
+        return response["resource_allocation"]
+    return response["handover_summary"]
+
+
 @session.bind(
     name="smart_automation",
     description="Triage Agent to instantly assess patient symptoms and vitals, determining if emergency care is needed. Use this agent when urgent medical attention may be required.",
 )
 async def smart_automation(agent_context, case_sheet: Annotated[str, "Text input"]):
     """
-    This function provides a state-driven automation workflow in the form of a dynamically
-    compiled state graph. It aims to manage user cases by evaluating input data against
+    This function provides a state-driven automation workflow in the form of a state graph
+    compiled once per process. It aims to manage user cases by evaluating input data against
     a sequence of operational states and decision-making nodes (e.g., triage, verification,
     and resource allocation). The workflow culminates in generating an actionable summary
-    or allocating appropriate resources based on the evaluated outcomes.
+    or allocating appropriate resources based on the evaluated outcomes. With
+    ``SPECULATIVE_CASE_HISTORY`` enabled, the case history lookup starts alongside triage and
+    is cancelled as soon as the case turns out LowRisk or unverified. With
+    ``WORKFLOW_CHECKPOINTING`` enabled, a case sheet resubmitted in the same session gets the
+    stored result of its earlier run, or resumes that run where it stopped.
 
     :param agent_context: Contextual information which includes logging and metadata about
                           the current interaction or session.
@@ -390,55 +785,22 @@ async def smart_automation(agent_context, case_sheet: Annotated[str, "Text input
              - A summary of actions to be performed (handover summary).
              - If verification fails or resource allocation status is not accepted:
                Returns the corresponding fallback response or resource allocation state.
+             - If this agent or one it calls is at capacity, or a model call times out: a
+               fallback response asking to resubmit.
              Type: Typically a dict containing the workflow's outcome or response data.
     """
     agent_context.logger.info("Inside smart_automation")
-    ag_builder = StateGraph(Sheet)
-    ag_builder.add_node("TriageAgent", triage_selection)
-    ag_builder.add_node("LowRisk", green_list)
-    ag_builder.add_node("HighRisk", red_list)
-    ag_builder.add_node("ResourceAvailability", check_resource_availability)
-    ag_builder.add_node("Appointment", doctor_appointment)
-    ag_builder.add_node("Emergency", emergency_action_list)
-    ag_builder.add_node("Verification", verification)
-    ag_builder.add_node("PreviousCaseHistory", search_case_history)
-    ag_builder.add_node("Summary", generate_summary)
-
-    def continue_graph(state):
-        if state["verified"] == "yes":
-            if state["criticality"] == "LowRisk":
-                return "Appointment"
-            return "PreviousCaseHistory"
-        else:
-            return END
-
-    def route(state):
-        if state["resource_allocation"]["admission_status"] == "Accepted":
-            return "Summary"
-        else:
-            return END
-
-    ag_builder.add_edge(START, "TriageAgent")
-    ag_builder.add_conditional_edges("TriageAgent", lambda s: s["criticality"], ["LowRisk", "HighRisk"])
-    ag_builder.add_edge("LowRisk", "Verification")
-    ag_builder.add_edge("HighRisk", "Verification")
-    ag_builder.add_conditional_edges("Verification", continue_graph, ["PreviousCaseHistory", "Appointment", END])
-    ag_builder.add_edge("PreviousCaseHistory", "Emergency")
-    ag_builder.add_edge("Emergency", "ResourceAvailability")
-    ag_builder.add_conditional_edges("ResourceAvailability", route, ["Summary", END])
-    ag_builder.add_edge("Summary", END)
-    graph = ag_builder.compile()
-    response = await graph.ainvoke({"sheet": case_sheet})
-
-    result = ""
-    if response["verified"] == "no":
-        result = response["fallback_response"]
-    elif response["verified"] == "yes" and response["criticality"] == "LowRisk":
-        result = response["appointment_details"]
-    elif response["resource_allocation"]["admission_status"] != "Accepted":
-        result = response["resource_allocation"]
-    else:
-        result = response["handover_summary"]
+    try:
+        async with admission.admit():
+            # AgentOS retries a request within its session, so the session stands in for the patient
+            response = await run_workflow(case_sheet, agent_context.session_id)
+        result = workflow_result(response)
+    except AdmissionRejected as e:
+        agent_context.logger.warning(f"Answering with a retry later: {e}")
+        result = e.fallback_response
+    except TimeoutError:
+        agent_context.logger.warning(f"A model call timed out after {settings.LLM_TIMEOUT}s, answering with a retry")
+        result = TIMEOUT_FALLBACK_RESPONSE
 
     final_response = f"""
     Please use this as the final result of the automation workflow:
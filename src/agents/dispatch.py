@@ -0,0 +1,89 @@
+"""
+In-process dispatch of agent-to-agent calls to the agents hosted by this worker
+"""
+
+import logging
+import time
+from typing import Dict, Union
+from uuid import UUID
+
+from genai_session.session import GenAISession
+from genai_session.utils.agents import AgentResponse
+
+from src.core.config import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+class LocalAgentContext:
+    """
+    Context handed to an agent invoked in-process, in place of the AgentOS one.
+
+    It carries the request and session ids of the calling agent; its logger writes to the process log, since there
+    is no AgentOS connection for the call to log to.
+    """
+
+    def __init__(self, agent_uuid: str, request_id: str = "", session_id: str = ""):
+        self.agent_uuid = agent_uuid
+        self.request_id = request_id
+        self.session_id = session_id
+        self.logger = logging.getLogger(f"{__name__}.{agent_uuid}")
+
+
+class LocalDispatcher:
+    """
+    Sends agent requests straight to the bound handler when the target agent is hosted in this process.
+
+    The handler is awaited in the calling task, so the request skips the JSON round trip through the AgentOS router,
+    and the LLM priority of the caller carries over to it. The :class:`AgentResponse` returned is what
+    ``GenAISession.send`` returns for the same call: the handler's answer, or ``is_success=False`` with the error
+    message when it raised. Agents not hosted here are reached through ``GenAISession.send``.
+    """
+
+    def __init__(self, enabled: bool = settings.LOCAL_AGENT_DISPATCH):
+        self.enabled = enabled
+        self._sessions: Dict[str, GenAISession] = {}
+        self.local_calls = 0
+        self.remote_calls = 0
+
+    def host(self, agent_id: Union[str, UUID], session: GenAISession) -> None:
+        """Mark the agent bound to ``session`` as hosted in this process."""
+        self._sessions[str(agent_id)] = session
+
+    def hosts(self, agent_id: Union[str, UUID]) -> bool:
+        session = self._sessions.get(str(agent_id))
+        return self.enabled and session is not None and session.agent is not None
+
+    async def send(self, session: GenAISession, message: dict, client_id: str) -> AgentResponse:
+        """
+        Invoke the agent ``client_id`` on behalf of the agent bound to ``session``.
+
+        Args:
+            session: Session of the calling agent, used to reach remote agents.
+            message: Arguments of the target agent.
+            client_id: UUID of the target agent.
+
+        Returns:
+            The response of the target agent.
+        """
+        if not self.hosts(client_id):
+            self.remote_calls += 1
+            return await session.send(message=message, client_id=client_id)
+
+        self.local_calls += 1
+        context = LocalAgentContext(client_id, session.request_id, session.session_id)
+        started = time.perf_counter()
+        try:
+            response = await self._sessions[str(client_id)].agent.handler(agent_context=context, **message)
+        except Exception as e:
+            logger.exception(f"Agent {client_id} failed")
+            return AgentResponse(is_success=False, execution_time=time.perf_counter() - started, response=str(e))
+        return AgentResponse(is_success=True, execution_time=time.perf_counter() - started, response=response)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hosted": len(self._sessions), "local_calls": self.local_calls, "remote_calls": self.remote_calls}
+
+
+local_dispatcher = LocalDispatcher()
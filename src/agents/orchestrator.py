@@ -15,6 +15,7 @@ from .agent_emergency_checklist import agent_property as agent_d_property
 from .agent_resource_availability_check import agent_property as agent_e_property
 from .agent_schema import Agent, AgentProperty
 from .agent_smart_automation import agent_property as agent_f_property
+from .dispatch import local_dispatcher
 
 settings = get_settings()
 agent_properties = [
@@ -99,6 +100,9 @@ def _get_agent_pool() -> List[Agent]:
 async def agent_orchestrator():
     """Orchestrate the registration and operation of all agents."""
     agent_pool = _get_agent_pool()
+    # agents call each other in-process from here on, whether or not AgentOS registration succeeds
+    for agent in agent_pool:
+        local_dispatcher.host(agent.agent_id, agent.source)
 
     await AgentStreamLine(
         agent_pool=agent_pool,
@@ -0,0 +1,96 @@
+"""
+Speculative execution of agent calls whose input is known before the graph decides it needs them
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculationStats:
+    """Counters of speculative work, with the latency it saved and the time spent on discarded work."""
+
+    def __init__(self):
+        self.launched = 0
+        self.used = 0
+        self.discarded = 0
+        self.failed = 0
+        self.saved_seconds = 0.0
+        self.wasted_seconds = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "launched": self.launched,
+            "used": self.used,
+            "discarded": self.discarded,
+            "failed": self.failed,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "wasted_seconds": round(self.wasted_seconds, 3),
+        }
+
+
+class _Speculation:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        task.add_done_callback(self._on_done)
+
+    def _on_done(self, task: asyncio.Task) -> None:
+        self.finished = time.perf_counter()
+        # retrieve the exception so a discarded failure is not reported as never retrieved
+        if not task.cancelled():
+            task.exception()
+
+
+class Speculator:
+    """
+    Starts work ahead of time under a run key and hands the result to whoever takes it, or cancels it.
+
+    Every started speculation must end with :meth:`take` or :meth:`discard`; discarding after a take is a no-op,
+    so callers can always discard in a ``finally`` block.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.stats = SpeculationStats()
+        self._running: Dict[str, _Speculation] = {}
+
+    def start(self, key: str, work: Awaitable[Any]) -> None:
+        """Schedule ``work`` now under ``key``."""
+        self._running[key] = _Speculation(asyncio.ensure_future(work))
+        self.stats.launched += 1
+
+    async def take(self, key: Optional[str], fallback: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the result of the speculation started under ``key``.
+
+        When nothing was started under ``key``, or the speculative work failed, ``fallback`` is awaited instead.
+        """
+        speculation = self._running.pop(key, None) if key else None
+        if speculation is None:
+            return await fallback()
+
+        taken = time.perf_counter()
+        try:
+            result = await speculation.task
+        except Exception as e:
+            self.stats.failed += 1
+            logger.warning(f"Speculative {self.name} failed, running it again: {e}")
+            return await fallback()
+        # the work ran for (finished - started); only the part before it was needed is latency saved
+        self.stats.used += 1
+        self.stats.saved_seconds += min(speculation.finished or taken, taken) - speculation.started
+        return result
+
+    def discard(self, key: Optional[str]) -> None:
+        """Cancel the speculation started under ``key`` if nobody took it."""
+        speculation = self._running.pop(key, None) if key else None
+        if speculation is None:
+            return
+        speculation.task.cancel()
+        self.stats.discarded += 1
+        self.stats.wasted_seconds += (speculation.finished or time.perf_counter()) - speculation.started
@@ -0,0 +1,46 @@
+"""
+HTTP endpoint exporting the in-process counters of the agents and LLM services
+"""
+
+from typing import Any, Dict
+
+from fastapi import APIRouter
+
+from src.agents.admission import admission_controllers
+from src.agents.agent_smart_automation import case_history_prefetch
+from src.agents.dispatch import local_dispatcher
+from src.services.checkpoint.sqlite import checkpoint_stats
+from src.services.llm.cache import response_caches
+from src.services.llm.registry import token_usage
+from src.services.llm.scheduler import llm_scheduler
+from src.services.llm.streaming import stream_latency
+from src.services.qdrant.vector_db import embedding_cache
+from src.services.resources.context import context_stats
+from src.services.resources.ledger import reservation_ledger
+
+router = APIRouter(prefix="/v1/metrics", tags=["metrics"])
+
+
+@router.get("")
+async def metrics() -> Dict[str, Any]:
+    """
+    Counters of this worker process since it started.
+
+    ``admission`` holds the running requests, queue depth and rejections per agent, ``llm_scheduler`` the queue
+    wait of the OpenAI requests per priority class and ``reservations`` the pending and confirmed resource
+    reservations; the other sections report token usage, streaming latency, prompt context sizes and the hit rates of
+    the response, embedding and speculative case history caches and of the workflow checkpoints.
+    """
+    return {
+        "admission": {name: controller.stats() for name, controller in admission_controllers.items()},
+        "agent_dispatch": local_dispatcher.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "token_usage": token_usage.as_dict(),
+        "stream_latency": stream_latency.as_dict(),
+        "prompt_context": context_stats.as_dict(),
+        "response_caches": {name: cache.stats() for name, cache in response_caches.items()},
+        "embedding_cache": embedding_cache.stats(),
+        "case_history_prefetch": case_history_prefetch.stats.as_dict(),
+        "workflow_checkpoints": checkpoint_stats.as_dict(),
+        "reservations": reservation_ledger.stats(),
+    }
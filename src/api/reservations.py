@@ -0,0 +1,20 @@
+"""
+HTTP endpoints managing the resources held by admitted patients
+"""
+
+from fastapi import APIRouter, HTTPException, status
+
+from src.services.resources.ledger import reservation_ledger
+
+router = APIRouter(prefix="/v1/reservations", tags=["reservations"])
+
+
+@router.delete("/{reservation_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def release_reservation(reservation_id: str) -> None:
+    """
+    Give back the bed or stretcher of an admission once the patient is discharged or transferred to another hospital.
+
+    The ``reservation_id`` is the one of the ``resource_allocation`` the workflow admitted the patient with.
+    """
+    if not await reservation_ledger.release(reservation_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reservation not found or already released")
@@ -0,0 +1,163 @@
+"""
+HTTP endpoints running the smart automation workflow directly
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, AsyncIterator, List, Optional
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+
+from src.agents.admission import AdmissionRejected
+from src.agents.agent_smart_automation import (
+    admission,
+    get_graph,
+    run_workflow,
+    workflow_config,
+    workflow_input,
+    workflow_result,
+)
+from src.core.config import get_settings
+from src.services.qdrant.vector_db import vector_store
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/v1/triage", tags=["triage"])
+
+
+class CaseSheetRequest(BaseModel):
+    case_sheet: str
+    # identical sheets of different patients are separate admissions, resubmissions for one patient are not
+    patient_id: str = ""
+
+
+class BatchTriageRequest(BaseModel):
+    case_sheets: List[str] = Field(min_length=1, max_length=settings.TRIAGE_BATCH_MAX_SHEETS)
+
+
+class CaseSheetResult(BaseModel):
+    index: int
+    result: Any = None
+    error: Optional[str] = None
+    seconds: float
+
+
+class BatchTriageResponse(BaseModel):
+    results: List[CaseSheetResult]
+    sheets: int
+    succeeded: int
+    failed: int
+    seconds: float
+    sheets_per_second: float
+
+
+def server_sent_event(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def workflow_events(case_sheet: str, progress: bool, patient_id: str = "") -> AsyncIterator[str]:
+    """
+    Run the workflow on a case sheet, yielding server-sent events.
+
+    ``chunk`` events carry the pieces of generated notes. With ``progress``, a ``node`` event also follows every
+    completed node with the state keys it changed. The run counts against the admission limit of the
+    ``smart_automation`` agent. A ``result`` event with the workflow outcome, or a retry later fallback when an agent
+    is at capacity, closes the stream. When the workflow fails otherwise (a model error or timeout, an unparsable
+    agent answer) an ``error`` event carrying the failure closes it instead, so clients can tell it from a dropped
+    connection. A sheet whose earlier run for the same ``patient_id`` completed is answered from its checkpoint with
+    the ``result`` event alone, and one whose earlier run stopped part way only streams the rest.
+    """
+    state = {"sheet": case_sheet}
+    try:
+        async with admission.admit(), workflow_config(case_sheet, patient_id) as config:
+            inputs, response = await workflow_input(case_sheet, config)
+            if response is not None:
+                yield server_sent_event("result", {"result": workflow_result(response)})
+                return
+            async for mode, data in get_graph().astream(inputs, config, stream_mode=["updates", "custom"]):
+                if mode == "custom":
+                    yield server_sent_event("chunk", data)
+                    continue
+                for node, update in data.items():
+                    # nodes returning the whole state would otherwise repeat every earlier result
+                    changed = {key: value for key, value in (update or {}).items() if state.get(key) != value}
+                    state.update(changed)
+                    if progress:
+                        yield server_sent_event("node", {"node": node, "update": changed})
+    except AdmissionRejected as e:
+        yield server_sent_event("result", {"result": e.fallback_response})
+        return
+    except Exception as e:
+        logger.exception("Streamed workflow failed")
+        yield server_sent_event("error", {"error": str(e) or type(e).__name__})
+        return
+    yield server_sent_event("result", {"result": workflow_result(state)})
+
+
+@router.post("/stream")
+async def stream_workflow(request: CaseSheetRequest, progress: bool = True) -> StreamingResponse:
+    """
+    Run the workflow on a case sheet and stream its progress.
+
+    A ``node`` event, carrying ``{"node": ..., "update": ...}``, is sent as soon as each node completes: triage,
+    verification, case history, emergency checklist, resource allocation, summary or appointment. Pass
+    ``progress=false`` to only stream the handover summary or appointment note. ``chunk`` events carry the notes as
+    they are generated, as ``{"node": ..., "chunk": ...}``, and the closing ``result`` event carries the same outcome
+    the ``smart_automation`` agent returns, or an ``error`` event carrying why the workflow failed.
+    """
+    return StreamingResponse(
+        workflow_events(request.case_sheet, progress, request.patient_id), media_type="text/event-stream"
+    )
+
+
+async def triage_sheet(index: int, case_sheet: str, semaphore: asyncio.Semaphore) -> CaseSheetResult:
+    async with semaphore:
+        start = time.perf_counter()
+        try:
+            response = await run_workflow(case_sheet)
+            return CaseSheetResult(
+                index=index, result=workflow_result(response), seconds=round(time.perf_counter() - start, 3)
+            )
+        except Exception as e:
+            logger.exception(f"Batch triage failed for case sheet {index}")
+            return CaseSheetResult(
+                index=index, error=str(e) or type(e).__name__, seconds=round(time.perf_counter() - start, 3)
+            )
+
+
+@router.post("/batch")
+async def triage_batch(request: BatchTriageRequest) -> BatchTriageResponse:
+    """
+    Run the workflow on many case sheets at once, at most ``TRIAGE_BATCH_CONCURRENCY`` at a time.
+
+    The sheets are embedded together in a single request up front, so their case history searches hit the embedding
+    cache, and identical LLM calls across sheets share one answer through the response caches. A sheet whose
+    workflow fails gets an ``error`` instead of a ``result`` without failing the batch. Results are in request order.
+    """
+    start = time.perf_counter()
+    try:
+        async with vector_store.borrow() as vector_db:
+            await vector_db.aembed_queries(request.case_sheets)
+    except Exception as e:
+        logger.warning(f"Case sheets of the batch will be embedded one by one, embedding them together failed: {e}")
+
+    semaphore = asyncio.Semaphore(settings.TRIAGE_BATCH_CONCURRENCY)
+    results = await asyncio.gather(
+        *(triage_sheet(index, case_sheet, semaphore) for index, case_sheet in enumerate(request.case_sheets))
+    )
+    seconds = time.perf_counter() - start
+    failed = sum(result.error is not None for result in results)
+    return BatchTriageResponse(
+        results=results,
+        sheets=len(results),
+        succeeded=len(results) - failed,
+        failed=failed,
+        seconds=round(seconds, 3),
+        sheets_per_second=round(len(results) / seconds, 2) if seconds else 0.0,
+    )
@@ -21,10 +21,63 @@ class Settings(BaseSettings):
     WORKER_COUNT: int = Field(default=1)
     CONCURRENT_THREAD_COUNT: int = Field(default=100)
     OPENAI_API_KEY: str = Field(default="")
+    LLM_TIMEOUT: float = 60.0
+    LLM_MAX_CONNECTIONS: int = 100
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    LLM_KEEPALIVE_EXPIRY: float = 60.0
+    NATIVE_STRUCTURED_OUTPUT: bool = True
+    LLM_PRIORITY_SCHEDULING: bool = True
+    LLM_SCHEDULER_CONCURRENCY: int = 64
+    LLM_SCHEDULER_HIGH_LIMIT: int = 64
+    LLM_SCHEDULER_NORMAL_LIMIT: int = 48
+    LLM_SCHEDULER_LOW_LIMIT: int = 16
+    LLM_CACHE_EMERGENCY_CHECKLIST: bool = True
+    LLM_CACHE_HANDOVER_SUMMARY: bool = True
+    LLM_CACHE_SEMANTIC: bool = False
+    LLM_CACHE_TTL: float = 3600.0
+    LLM_CACHE_MAX_ENTRIES: int = 1024
+    LLM_CACHE_SIMILARITY_THRESHOLD: float = 0.97
+    LLM_CACHE_COLLECTION: str = "llm_response_cache"
+    FUSED_TRIAGE_VERIFICATION: bool = False
+    SPECULATIVE_CASE_HISTORY: bool = False
+    WORKFLOW_CHECKPOINTING: bool = True
+    WORKFLOW_CHECKPOINT_PATH: str = Field(default=".workflow_checkpoints.db")
+    WORKFLOW_CHECKPOINT_TTL: float | None = None
+    TRIAGE_BATCH_CONCURRENCY: int = 8
+    TRIAGE_BATCH_MAX_SHEETS: int = 100
+    LOCAL_AGENT_DISPATCH: bool = True
+    ADMISSION_CONTROL: bool = True
+    ADMISSION_QUEUE_SIZE: int = 64
+    ADMISSION_TIMEOUT: float = 30.0
+    SMART_AUTOMATION_CONCURRENCY: int = 16
+    CASE_HISTORY_CONCURRENCY: int = 32
+    EMERGENCY_CHECKLIST_CONCURRENCY: int = 16
+    RESOURCE_CHECK_CONCURRENCY: int = 32
+    RESOURCE_RELOAD_INTERVAL: float = 1.0
+    RULE_BASED_ALLOCATION: bool = True
+    HOSPITAL_LOCATION: str = ""
+    RESERVATION_TTL: float = 900.0
+    RESERVATION_SWEEP_INTERVAL: float = 60.0
+    PROMPT_CONTEXT_PRUNING: bool = True
+    PROMPT_TOKENIZER_MODEL: str = "gpt-4.1"
     QDRANT_COLLECTION: str = Field(default="vector_collection")
     OPENAI_EMBEDDING_MODEL: str = Field(default="text-embedding-3-large")
     OPENAI_EMBEDDING_DIMENSIONS: int = Field(default=3072)
     QDRANT_URL: str = Field(default="http://localhost:6333")
+    QDRANT_TIMEOUT: int = 30
+    QDRANT_MAX_CONNECTIONS: int = 20
+    QDRANT_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    QDRANT_HEALTH_CHECK_INTERVAL: float = 30.0
+    QDRANT_INDEXING_THRESHOLD: int = 20000
+    QDRANT_OPTIMIZER_TIMEOUT: float = 600.0
+    QDRANT_SYNC_ON_STARTUP: bool = True
+    QDRANT_MANIFEST_DIR: str = Field(default="")
+    INGEST_BATCH_SIZE: int = 64
+    INGEST_CONCURRENCY: int = 4
+    INGEST_READ_CHUNK_SIZE: int = 64 * 1024
+    EMBEDDING_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    EMBEDDING_CACHE_DIR: str = Field(default="")
+    EMBEDDING_CACHE_DISK_SLOTS: int = 10000
     EDGES_PER_NODE: int = 8
     CUSTOM_PAYLOAD_M: int = 16
     NEIGHBORS_NUM: int = 50
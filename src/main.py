@@ -7,8 +7,15 @@ import anyio.to_thread
 from fastapi import FastAPI, status
 
 from src.agents.orchestrator import agent_orchestrator
+from src.api.metrics import router as metrics_router
+from src.api.reservations import router as reservations_router
+from src.api.triage import router as triage_router
 from src.core.config import get_settings
-from src.services.qdrant.vector_db import Qdrant
+from src.services.checkpoint.sqlite import workflow_checkpointer
+from src.services.llm.registry import chain_registry
+from src.services.qdrant.vector_db import vector_store
+from src.services.resources.context import tokenizer
+from src.services.resources.ledger import reservation_ledger
 
 settings = get_settings()
 
@@ -19,13 +26,23 @@ async def lifespan(app: FastAPI):  # pragma: no cover
     limiter = anyio.to_thread.current_default_thread_limiter()
     limiter.total_tokens = settings.CONCURRENT_THREAD_COUNT
     asyncio.create_task(agent_orchestrator())
-    async with Qdrant(index_name=settings.QDRANT_COLLECTION):
-        ...
+    reservation_sweeper = asyncio.create_task(reservation_ledger.sweep())
+    await vector_store.open()
+    await chain_registry.open()
+    await tokenizer.load()
 
     yield
 
+    reservation_sweeper.cancel()
+    await chain_registry.close()
+    await vector_store.close()
+    await workflow_checkpointer.close()
+
 
 app = FastAPI(docs_url="/", lifespan=lifespan)
+app.include_router(triage_router)
+app.include_router(metrics_router)
+app.include_router(reservations_router)
 
 
 @app.get("/health", status_code=status.HTTP_200_OK)
@@ -0,0 +1,173 @@
+"""
+SQLite-backed LangGraph checkpointer, so a workflow run can be looked up or resumed by its thread id
+"""
+
+import logging
+import time
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from src.core.config import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointStats:
+    """Workflow runs answered from a completed checkpoint, resumed from a partial one, or started afresh."""
+
+    def __init__(self):
+        self.hits = 0
+        self.resumed = 0
+        self.misses = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        lookups = self.hits + self.resumed + self.misses
+        return {
+            "hits": self.hits,
+            "resumed": self.resumed,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+checkpoint_stats = CheckpointStats()
+
+
+class TTLSqliteSaver(AsyncSqliteSaver):
+    """
+    LangGraph's ``AsyncSqliteSaver``, forgetting a thread ``ttl`` seconds after its last checkpoint.
+
+    When each thread was last checkpointed is kept in a ``checkpoint_threads`` table next to the saver's own. A
+    thread past its TTL is never returned, and is deleted on the first checkpoint and at most once per ``ttl / 10``
+    seconds afterwards.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, ttl: float):
+        super().__init__(conn)
+        self.ttl = ttl
+        self._threads_table = False
+        self._pruned_at = 0.0
+
+    async def setup(self) -> None:
+        await super().setup()
+        if self._threads_table:
+            return
+        async with self.lock:
+            await self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS checkpoint_threads (thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)"
+            )
+            await self.conn.commit()
+        self._threads_table = True
+
+    def _cutoff(self) -> float:
+        return time.time() - self.ttl
+
+    async def _live(self, thread_id: str) -> bool:
+        await self.setup()
+        async with (
+            self.lock,
+            self.conn.execute("SELECT updated_at FROM checkpoint_threads WHERE thread_id = ?", (thread_id,)) as cursor,
+        ):
+            row = await cursor.fetchone()
+        return row is not None and row[0] >= self._cutoff()
+
+    async def prune(self) -> int:
+        """Delete the threads past their TTL, returning how many were deleted."""
+        await self.setup()
+        cutoff = self._cutoff()
+        expired = "SELECT thread_id FROM checkpoint_threads WHERE updated_at < ?"
+        async with self.lock, self.conn.cursor() as cursor:
+            await cursor.execute(f"DELETE FROM checkpoints WHERE thread_id IN ({expired})", (cutoff,))
+            await cursor.execute(f"DELETE FROM writes WHERE thread_id IN ({expired})", (cutoff,))
+            await cursor.execute("DELETE FROM checkpoint_threads WHERE updated_at < ?", (cutoff,))
+            deleted = cursor.rowcount
+            await self.conn.commit()
+        self._pruned_at = time.monotonic()
+        if deleted:
+            logger.info(f"Pruned the checkpoints of {deleted} workflow runs older than {self.ttl}s")
+        return deleted
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        if not await self._live(str(config["configurable"]["thread_id"])):
+            return None
+        return await super().aget_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        if config is None:
+            await self.prune()
+        elif not await self._live(str(config["configurable"]["thread_id"])):
+            return
+        async for checkpoint_tuple in super().alist(config, filter=filter, before=before, limit=limit):
+            yield checkpoint_tuple
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = await super().aput(config, checkpoint, metadata, new_versions)
+        async with self.lock:
+            await self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoint_threads (thread_id, updated_at) VALUES (?, ?)",
+                (str(config["configurable"]["thread_id"]), time.time()),
+            )
+            await self.conn.commit()
+        if time.monotonic() - self._pruned_at >= self.ttl / 10:
+            await self.prune()
+        return next_config
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await super().adelete_thread(thread_id)
+        async with self.lock:
+            await self.conn.execute("DELETE FROM checkpoint_threads WHERE thread_id = ?", (str(thread_id),))
+            await self.conn.commit()
+
+
+class WorkflowCheckpointer:
+    """
+    Process-wide :class:`TTLSqliteSaver` the workflow graph is compiled with.
+
+    ``AsyncSqliteSaver`` binds to the event loop running when it is built, so the saver is built on first use
+    instead of at import time. ``ttl`` defaults to ``WORKFLOW_CHECKPOINT_TTL``, or else to ``RESERVATION_TTL``, so a
+    run is not kept longer than the reservation it made.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = settings.WORKFLOW_CHECKPOINT_PATH,
+        ttl: Optional[float] = settings.WORKFLOW_CHECKPOINT_TTL,
+    ):
+        self.path = Path(path)
+        self.ttl = settings.RESERVATION_TTL if ttl is None else ttl
+        self._saver: Optional[TTLSqliteSaver] = None
+
+    def get(self) -> TTLSqliteSaver:
+        if self._saver is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._saver = TTLSqliteSaver(aiosqlite.connect(self.path), self.ttl)
+        return self._saver
+
+    async def close(self) -> None:
+        """Close the connection of the saver, whose worker thread otherwise keeps the process alive."""
+        saver, self._saver = self._saver, None
+        if saver is not None and saver.conn.is_alive():
+            await saver.conn.close()
+
+
+workflow_checkpointer = WorkflowCheckpointer()
@@ -0,0 +1,263 @@
+"""
+Response cache for deterministic (``temperature=0``) LLM chains
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, Type
+
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel
+from qdrant_client import models
+
+from src.core.config import get_settings
+from src.services.qdrant.vector_db import vector_store
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+response_caches: Dict[str, "ResponseCache"] = {}
+
+
+class ResponseCache:
+    """
+    Serves repeated chain calls from memory, and optionally near-identical ones from Qdrant.
+
+    The exact tier is an LRU of at most ``max_entries`` responses keyed by a hash of the chain inputs. The semantic
+    tier, when enabled, embeds ``similarity_text`` and reuses the response of a previous call whose text scores at
+    least ``threshold`` in the ``LLM_CACHE_COLLECTION`` collection. Entries of both tiers expire after ``ttl``
+    seconds, and concurrent misses for the same inputs share a single chain call.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        enabled: bool = True,
+        semantic: bool = False,
+        response_model: Optional[Type[BaseModel]] = None,
+        ttl: float = settings.LLM_CACHE_TTL,
+        max_entries: int = settings.LLM_CACHE_MAX_ENTRIES,
+        threshold: float = settings.LLM_CACHE_SIMILARITY_THRESHOLD,
+        collection_name: str = settings.LLM_CACHE_COLLECTION,
+    ):
+        self.name = name
+        self.enabled = enabled
+        self.semantic = semantic
+        self.response_model = response_model
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.collection_name = collection_name
+        self._entries: OrderedDict[str, Tuple[float, Any]] = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._collection_ready = False
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        response_caches[name] = self
+
+    def key(self, inputs: Dict[str, Any]) -> str:
+        canonical = json.dumps(inputs, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(f"{self.name}:{canonical}".encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def put(self, key: str, response: Any) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def ainvoke(
+        self,
+        chain: Runnable,
+        inputs: Dict[str, Any],
+        similarity_text: Optional[str] = None,
+        key_inputs: Optional[Dict[str, Any]] = None,
+    ) -> Any:
+        """
+        Return the cached response to ``inputs`` or invoke ``chain`` and cache its response.
+
+        Args:
+            chain: Chain to invoke on a miss.
+            inputs: Chain inputs.
+            similarity_text: Text compared by the semantic tier, which is skipped when it is not given.
+            key_inputs: Inputs keying the exact tier instead of ``inputs``, leaving out values that do not change
+                the response.
+
+        Returns:
+            The chain response.
+        """
+        if not self.enabled:
+            return await chain.ainvoke(inputs)
+        key = self.key(inputs if key_inputs is None else key_inputs)
+        if (response := self.get(key)) is not None:
+            self.hits += 1
+            return response
+        while (pending := self._pending.get(key)) is not None:
+            try:
+                response = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # the request computing this response was cancelled, compute it here instead of failing too
+                if not pending.cancelled():
+                    raise
+                continue
+            self.hits += 1
+            return response
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            response = await self._lookup_or_invoke(key, chain, inputs, similarity_text)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # mark the exception retrieved so it is not reported when nobody else awaited it
+            future.exception()
+            raise
+        finally:
+            del self._pending[key]
+        future.set_result(response)
+        self.put(key, response)
+        return response
+
+    async def astream(
+        self, chain: Runnable, inputs: Dict[str, Any], key_inputs: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream the answer of a chain producing text, from the exact tier when cached.
+
+        A cached answer is yielded as a single chunk. On a miss the chunks of ``chain`` are yielded as they arrive
+        and the complete answer is cached once the stream ends; concurrent misses are not shared.
+
+        Args:
+            chain: Chain to stream on a miss.
+            inputs: Chain inputs.
+            key_inputs: Inputs keying the exact tier instead of ``inputs``.
+        """
+        if not self.enabled:
+            async for chunk in chain.astream(inputs):
+                yield chunk
+            return
+        key = self.key(inputs if key_inputs is None else key_inputs)
+        if (response := self.get(key)) is not None:
+            self.hits += 1
+            yield response
+            return
+        self.misses += 1
+        parts = []
+        async for chunk in chain.astream(inputs):
+            parts.append(chunk)
+            yield chunk
+        self.put(key, "".join(parts))
+
+    async def _lookup_or_invoke(
+        self, key: str, chain: Runnable, inputs: Dict[str, Any], similarity_text: Optional[str]
+    ) -> Any:
+        vector = None
+        if self.semantic and similarity_text:
+            try:
+                vector, response = await self._semantic_lookup(similarity_text)
+            except Exception as e:
+                logger.warning(f"Semantic {self.name} cache lookup failed: {e}")
+            else:
+                if response is not None:
+                    self.semantic_hits += 1
+                    return response
+
+        self.misses += 1
+        response = await chain.ainvoke(inputs)
+        if vector is not None:
+            try:
+                await self._semantic_store(key, vector, response)
+            except Exception as e:
+                logger.warning(f"Could not store the {self.name} response in the semantic cache: {e}")
+        return response
+
+    async def _ensure_collection(self, vector_db) -> None:
+        if self._collection_ready:
+            return
+        client = vector_db.async_client
+        if not await client.collection_exists(self.collection_name):
+            await client.create_collection(
+                self.collection_name,
+                vectors_config=models.VectorParams(size=vector_db.dimensions, distance=models.Distance.COSINE),
+            )
+        else:
+            await client.delete(
+                self.collection_name,
+                points_selector=models.Filter(
+                    must=[models.FieldCondition(key="expires_at", range=models.Range(lt=time.time()))]
+                ),
+            )
+        self._collection_ready = True
+
+    async def _semantic_lookup(self, text: str) -> Tuple[list[float], Optional[Any]]:
+        async with vector_store.borrow() as vector_db:
+            await self._ensure_collection(vector_db)
+            vector = await vector_db.aembed_query(text)
+            result = await vector_db.async_client.query_points(
+                self.collection_name,
+                query=vector,
+                query_filter=models.Filter(
+                    must=[
+                        models.FieldCondition(key="chain", match=models.MatchValue(value=self.name)),
+                        models.FieldCondition(key="expires_at", range=models.Range(gt=time.time())),
+                    ]
+                ),
+                score_threshold=self.threshold,
+                limit=1,
+                with_payload=True,
+            )
+        if not result.points:
+            return vector, None
+        response = result.points[0].payload["response"]
+        if self.response_model is not None:
+            response = self.response_model.model_validate_json(response)
+        return vector, response
+
+    async def _semantic_store(self, key: str, vector: list[float], response: Any) -> None:
+        async with vector_store.borrow() as vector_db:
+            await vector_db.async_client.upsert(
+                self.collection_name,
+                points=[
+                    models.PointStruct(
+                        id=str(uuid.UUID(key[:32])),
+                        vector=vector,
+                        payload={
+                            "chain": self.name,
+                            "response": response.model_dump_json() if isinstance(response, BaseModel) else response,
+                            "expires_at": time.time() + self.ttl,
+                        },
+                    )
+                ],
+            )
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+        }
@@ -0,0 +1,173 @@
+"""
+Process-wide registry of the LLM chains used by the agents
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import PydanticOutputParser
+from langchain_core.prompts import BasePromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
+from langchain_openai import ChatOpenAI
+
+from src.core.config import get_settings
+from src.services.llm.scheduler import openai_http_client
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+def connection_limits() -> httpx.Limits:
+    """Connection pool bounds shared by the OpenAI clients."""
+    return httpx.Limits(
+        max_connections=settings.LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY,
+    )
+
+
+NATIVE_FORMAT_INSTRUCTIONS = "Respond with a JSON object that follows the provided response schema."
+
+
+class TokenUsage:
+    """Tokens sent and received per chain."""
+
+    def __init__(self):
+        self.chains: Dict[str, Dict[str, int]] = {}
+
+    def record(self, name: str, message: AIMessage) -> None:
+        usage = message.usage_metadata or {}
+        stats = self.chains.setdefault(name, {"calls": 0, "input_tokens": 0, "output_tokens": 0})
+        stats["calls"] += 1
+        stats["input_tokens"] += usage.get("input_tokens", 0)
+        stats["output_tokens"] += usage.get("output_tokens", 0)
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {**stats, "input_tokens_per_call": round(stats["input_tokens"] / stats["calls"], 1)}
+            for name, stats in self.chains.items()
+        }
+
+
+token_usage = TokenUsage()
+
+
+class ChainRegistry:
+    """
+    Builds every agent chain once and shares one pooled, keep-alive HTTP client per model.
+
+    Agents register a builder per chain at import time and fetch the built chain with :meth:`get` on each call.
+    :meth:`open` builds every registered chain and opens a connection per model during the application startup, so
+    requests neither construct chains nor pay for TLS handshakes. A chain registered or requested later is built on
+    first use.
+    """
+
+    def __init__(self):
+        self._builders: Dict[str, Callable[[], Runnable]] = {}
+        self._chains: Dict[str, Runnable] = {}
+        self._models: Dict[Tuple[str, Optional[float]], ChatOpenAI] = {}
+        self._http_clients: Dict[str, httpx.AsyncClient] = {}
+
+    def model(self, model: str, timeout: Optional[float] = None) -> ChatOpenAI:
+        """Return the shared ``temperature=0`` chat model for ``model``, built on the pooled client of the model."""
+        key = (model, timeout)
+        if key not in self._models:
+            if model not in self._http_clients:
+                self._http_clients[model] = openai_http_client(connection_limits())
+            self._models[key] = ChatOpenAI(
+                model=model, temperature=0, timeout=timeout, http_async_client=self._http_clients[model]
+            )
+        return self._models[key]
+
+    def structured(
+        self,
+        name: str,
+        prompt: BasePromptTemplate,
+        model: ChatOpenAI,
+        output_parser: PydanticOutputParser,
+        format_instructions: Optional[str] = None,
+    ) -> Runnable:
+        """
+        Chain ``prompt`` into ``model`` and parse the answer into the pydantic object of ``output_parser``.
+
+        With ``NATIVE_STRUCTURED_OUTPUT`` the model is constrained to the JSON schema of the object, and the
+        ``format_instructions`` variable of the prompt only holds a one-line reminder. Otherwise it holds the parser
+        format instructions, or ``format_instructions`` when given, and the free-text answer is parsed. Either way the
+        token usage of every call is recorded under ``name``.
+        """
+
+        def record(message: AIMessage) -> AIMessage:
+            token_usage.record(name, message)
+            return message
+
+        if not settings.NATIVE_STRUCTURED_OUTPUT:
+            instructions = format_instructions or output_parser.get_format_instructions()
+            return prompt.partial(format_instructions=instructions) | model | RunnableLambda(record) | output_parser
+
+        def parsed(response: dict) -> Any:
+            record(response["raw"])
+            if response["parsed"] is None:
+                raise OutputParserException(
+                    f"{name} answer does not follow the response schema: {response['parsing_error']}",
+                    llm_output=response["raw"].content,
+                )
+            return response["parsed"]
+
+        structured_model = model.with_structured_output(
+            output_parser.pydantic_object, method="json_schema", include_raw=True
+        )
+        return (
+            prompt.partial(format_instructions=NATIVE_FORMAT_INSTRUCTIONS) | structured_model | RunnableLambda(parsed)
+        )
+
+    def register(self, name: str, build: Callable[[], Runnable]) -> None:
+        """Register the builder of a chain, replacing any chain built under ``name`` before."""
+        self._builders[name] = build
+        self._chains.pop(name, None)
+
+    def get(self, name: str) -> Runnable:
+        if name not in self._chains:
+            self._chains[name] = self._builders[name]()
+        return self._chains[name]
+
+    async def open(self) -> None:
+        """Build every registered chain and open a connection per model."""
+        try:
+            for name in self._builders:
+                self.get(name)
+        except Exception as e:
+            logger.error(f"LLM chains will be built on first use, building them failed: {e}")
+            return
+        logger.info(f"Built {len(self._chains)} LLM chains on {len(self._http_clients)} HTTP clients")
+        await self.warm_up()
+
+    async def warm_up(self) -> None:
+        """Open a keep-alive connection to the API on each HTTP client by listing the models."""
+        models = {}
+        for (model, _), chat_model in self._models.items():
+            models.setdefault(model, chat_model)
+        results = await asyncio.gather(
+            *(
+                chat_model.root_async_client.with_options(max_retries=0, timeout=10).models.list()
+                for chat_model in models.values()
+            ),
+            return_exceptions=True,
+        )
+        for model, result in zip(models, results, strict=True):
+            if isinstance(result, Exception):
+                logger.warning(f"Could not warm up the connection for {model}: {result}")
+
+    async def close(self) -> None:
+        for client in self._http_clients.values():
+            await client.aclose()
+        self._http_clients.clear()
+        self._models.clear()
+        self._chains.clear()
+
+
+chain_registry = ChainRegistry()
@@ -0,0 +1,199 @@
+"""
+Priority scheduling of the outbound OpenAI requests, so HighRisk cases are not queued behind LowRisk ones
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Deque, Dict, Iterator, Optional
+
+import httpx
+
+from src.core.config import get_settings
+
+settings = get_settings()
+
+# scheduling classes, most urgent first
+PRIORITY_CLASSES = ("high", "normal", "low")
+
+_CRITICALITY_CLASSES = {"HighRisk": "high", "LowRisk": "low"}
+
+_priority: ContextVar[str] = ContextVar("llm_priority", default="normal")
+
+
+def priority_class(criticality: Optional[str]) -> str:
+    """Scheduling class of a case: ``high`` for HighRisk, ``low`` for LowRisk and ``normal`` until triaged."""
+    return _CRITICALITY_CLASSES.get(criticality, "normal")
+
+
+@contextmanager
+def llm_priority(criticality: Optional[str]) -> Iterator[str]:
+    """Schedule the OpenAI requests made inside the block, and the tasks it starts, by the case criticality."""
+    token = _priority.set(priority_class(criticality))
+    try:
+        yield _priority.get()
+    finally:
+        _priority.reset(token)
+
+
+class _ClassStats:
+    def __init__(self, samples: int):
+        self.requests = 0
+        self.queued = 0
+        self.wait_seconds = 0.0
+        self.waits: Deque[float] = deque(maxlen=samples)
+
+    def record(self, wait: float, queued: bool) -> None:
+        self.requests += 1
+        self.queued += queued
+        self.wait_seconds += wait
+        self.waits.append(wait)
+
+    def percentile(self, fraction: float) -> float:
+        if not self.waits:
+            return 0.0
+        waits = sorted(self.waits)
+        return waits[min(len(waits) - 1, int(fraction * len(waits)))]
+
+
+class PriorityScheduler:
+    """
+    Bounds the OpenAI requests in flight and hands freed slots to the most urgent waiting class first.
+
+    At most ``limit`` requests run at once, and each class at most its own cap, so keeping the ``low`` cap below
+    ``limit`` leaves slots for HighRisk requests however many LowRisk ones are waiting. Requests of a class are served
+    in arrival order. A slot is held until the response has been read, streamed answers included.
+    """
+
+    def __init__(
+        self,
+        limit: int = settings.LLM_SCHEDULER_CONCURRENCY,
+        caps: Optional[Dict[str, int]] = None,
+        samples: int = 1024,
+    ):
+        self.limit = limit
+        self.caps = caps or {
+            "high": settings.LLM_SCHEDULER_HIGH_LIMIT,
+            "normal": settings.LLM_SCHEDULER_NORMAL_LIMIT,
+            "low": settings.LLM_SCHEDULER_LOW_LIMIT,
+        }
+        self._running = 0
+        self._active = dict.fromkeys(PRIORITY_CLASSES, 0)
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {name: deque() for name in PRIORITY_CLASSES}
+        self._stats = {name: _ClassStats(samples) for name in PRIORITY_CLASSES}
+
+    def _can_run(self, priority: str) -> bool:
+        return self._running < self.limit and self._active[priority] < self.caps[priority]
+
+    def _start(self, priority: str) -> None:
+        self._running += 1
+        self._active[priority] += 1
+
+    async def acquire(self, priority: Optional[str] = None) -> str:
+        """
+        Wait for a slot of the current class, or of ``priority`` when given.
+
+        Returns:
+            The class holding the slot, to pass to :meth:`release`.
+        """
+        priority = priority or _priority.get()
+        started = time.perf_counter()
+        queued = bool(self._waiters[priority]) or not self._can_run(priority)
+        if queued:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters[priority].append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # the slot was granted while this request was being cancelled
+                    self.release(priority)
+                elif waiter in self._waiters[priority]:
+                    # release() already dropped the waiter when it came across it cancelled
+                    self._waiters[priority].remove(waiter)
+                raise
+        else:
+            self._start(priority)
+        self._stats[priority].record(time.perf_counter() - started, queued)
+        return priority
+
+    def release(self, priority: str) -> None:
+        self._running -= 1
+        self._active[priority] -= 1
+        for name in PRIORITY_CLASSES:
+            waiters = self._waiters[name]
+            while waiters and self._can_run(name):
+                waiter = waiters.popleft()
+                if not waiter.done():
+                    self._start(name)
+                    waiter.set_result(None)
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "requests": stats.requests,
+                "queued": stats.queued,
+                "in_flight": self._active[name],
+                "waiting": len(self._waiters[name]),
+                "avg_wait_ms": round(1000 * stats.wait_seconds / stats.requests, 2) if stats.requests else 0.0,
+                "p50_wait_ms": round(1000 * stats.percentile(0.5), 2),
+                "p99_wait_ms": round(1000 * stats.percentile(0.99), 2),
+            }
+            for name, stats in self._stats.items()
+        }
+
+
+llm_scheduler = PriorityScheduler()
+
+
+class _ScheduledStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, scheduler: PriorityScheduler, priority: str):
+        self._stream = stream
+        self._scheduler = scheduler
+        self._priority: Optional[str] = priority
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._priority is not None:
+                self._scheduler.release(self._priority)
+                self._priority = None
+
+
+class ScheduledTransport(httpx.AsyncBaseTransport):
+    """HTTP transport sending each request once ``scheduler`` grants it a slot, released when the response closes."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, scheduler: PriorityScheduler = llm_scheduler):
+        self.transport = transport
+        self.scheduler = scheduler
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        priority = await self.scheduler.acquire()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            self.scheduler.release(priority)
+            raise
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_ScheduledStream(response.stream, self.scheduler, priority),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def openai_http_client(limits: httpx.Limits) -> httpx.AsyncClient:
+    """Pooled client for the OpenAI SDK, scheduled by :data:`llm_scheduler` with ``LLM_PRIORITY_SCHEDULING``."""
+    if not settings.LLM_PRIORITY_SCHEDULING:
+        return httpx.AsyncClient(limits=limits)
+    return httpx.AsyncClient(transport=ScheduledTransport(httpx.AsyncHTTPTransport(limits=limits)))
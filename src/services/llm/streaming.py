@@ -0,0 +1,64 @@
+"""
+Streaming of free-text LLM answers out of the graph nodes that generate them
+"""
+
+import time
+from typing import AsyncIterator, Dict
+
+from langgraph.config import get_stream_writer
+
+
+class StreamLatency:
+    """Time to the first chunk and to the complete answer per streamed chain."""
+
+    def __init__(self):
+        self.chains: Dict[str, Dict[str, float]] = {}
+
+    def record(self, name: str, first_chunk_seconds: float, total_seconds: float) -> None:
+        stats = self.chains.setdefault(name, {"calls": 0, "first_chunk_seconds": 0.0, "total_seconds": 0.0})
+        stats["calls"] += 1
+        stats["first_chunk_seconds"] += first_chunk_seconds
+        stats["total_seconds"] += total_seconds
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        return {
+            name: {
+                "calls": stats["calls"],
+                "avg_first_chunk_seconds": round(stats["first_chunk_seconds"] / stats["calls"], 3),
+                "avg_total_seconds": round(stats["total_seconds"] / stats["calls"], 3),
+            }
+            for name, stats in self.chains.items()
+        }
+
+
+stream_latency = StreamLatency()
+
+
+async def stream_text(name: str, chunks: AsyncIterator[str]) -> str:
+    """
+    Forward the chunks of an answer to the graph's ``custom`` stream as they arrive and return the whole answer.
+
+    Each chunk is written as ``{"node": name, "chunk": chunk}``; when the graph is not streamed in ``custom`` mode
+    the writes are dropped. Must be called from inside a graph node.
+
+    Args:
+        name: Name the chunks and the latency are reported under.
+        chunks: Text chunks of the answer, e.g. ``chain.astream(inputs)`` of a chain ending in ``StrOutputParser``.
+
+    Returns:
+        The concatenated answer.
+    """
+    writer = get_stream_writer()
+    started = time.perf_counter()
+    first_chunk_seconds = None
+    parts = []
+    async for chunk in chunks:
+        if first_chunk_seconds is None:
+            first_chunk_seconds = time.perf_counter() - started
+        parts.append(chunk)
+        writer({"node": name, "chunk": chunk})
+    total_seconds = time.perf_counter() - started
+    stream_latency.record(
+        name, first_chunk_seconds if first_chunk_seconds is not None else total_seconds, total_seconds
+    )
+    return "".join(parts)
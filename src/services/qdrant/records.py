@@ -0,0 +1,76 @@
+import codecs
+import hashlib
+import json
+import uuid
+from pathlib import Path
+from typing import AsyncIterator
+
+import aiofiles
+
+from src.core.config import get_settings
+
+settings = get_settings()
+
+VECTOR_DATA_PATH = Path(__file__).parent / "data/qdrant_data.json"
+
+
+async def aiter_json_array(path: Path, chunk_size: int = settings.INGEST_READ_CHUNK_SIZE) -> AsyncIterator[dict]:
+    """
+    Incrementally parse a file holding a top-level JSON array, yielding one element at a time.
+
+    Only ``chunk_size`` bytes plus the element being decoded are held in memory, so arbitrarily large
+    datasets are read with flat memory.
+
+    Args:
+        path: JSON file to read.
+        chunk_size: Number of bytes read per chunk.
+
+    Yields:
+        Each element of the array.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")()
+    buffer, position, started, eof = "", 0, False, False
+
+    async with aiofiles.open(path, "rb") as json_file:
+        while True:
+            while position < len(buffer) and (buffer[position].isspace() or buffer[position] == ","):
+                position += 1
+            if position < len(buffer) and not started:
+                if buffer[position] != "[":
+                    raise ValueError(f"{path} does not contain a JSON array")
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == "]":
+                return
+            if position < len(buffer):
+                try:
+                    element, end = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                else:
+                    # an element ending exactly at the buffer edge may be a truncated scalar, read on first
+                    if end < len(buffer) or eof:
+                        yield element
+                        position = end
+                        continue
+            if eof:
+                raise ValueError(f"{path} ended before the JSON array was closed")
+
+            chunk = await json_file.read(chunk_size)
+            eof = not chunk
+            buffer = buffer[position:] + text_decoder.decode(chunk, final=eof)
+            position = 0
+
+
+def record_hash(record: dict) -> str:
+    """Content hash of a case record, stable across key order and formatting of the source file."""
+    canonical = json.dumps(record, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def point_id(content_hash: str) -> str:
+    """Deterministic point ID for a record hash, so re-ingesting a record overwrites the same point."""
+    return str(uuid.UUID(hex=content_hash[:32]))
@@ -0,0 +1,190 @@
+"""
+Precomputed embedding snapshots for the case dataset.
+
+A snapshot stores one float32 row per record in ``<dataset>.<model>-<dimensions>.vectors.npy`` and the matching
+record hashes in ``<dataset>.<model>-<dimensions>.keys.npy``. When a snapshot sits next to the dataset, ingestion
+upserts the stored vectors instead of calling the embedding API. Export one with::
+
+    python -m src.services.qdrant.snapshot --data src/services/qdrant/data/qdrant_data.json
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+from langchain_openai import OpenAIEmbeddings
+
+from src.core.config import get_settings
+from src.services.qdrant.records import VECTOR_DATA_PATH, aiter_json_array, record_hash
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+def snapshot_paths(
+    data_path: Path,
+    model: str = settings.OPENAI_EMBEDDING_MODEL,
+    dimensions: int = settings.OPENAI_EMBEDDING_DIMENSIONS,
+) -> tuple[Path, Path]:
+    """Return the vectors and keys files of the snapshot for a dataset and embedding model."""
+    stem = f"{data_path.stem}.{model}-{dimensions}"
+    return data_path.with_name(f"{stem}.vectors.npy"), data_path.with_name(f"{stem}.keys.npy")
+
+
+class EmbeddingSnapshot:
+    """Read-only, memory-mapped view over exported embeddings keyed by record hash."""
+
+    def __init__(self, vectors: np.ndarray, keys: np.ndarray):
+        self.vectors = vectors
+        self.rows = {key.decode(): row for row, key in enumerate(keys.tolist())}
+
+    def __len__(self):
+        return len(self.rows)
+
+    @classmethod
+    def open(
+        cls,
+        data_path: Path,
+        model: str = settings.OPENAI_EMBEDDING_MODEL,
+        dimensions: int = settings.OPENAI_EMBEDDING_DIMENSIONS,
+    ) -> "EmbeddingSnapshot | None":
+        """
+        Memory-map the snapshot of a dataset.
+
+        Returns:
+            The snapshot, or None when there is none for this model or its shape does not match.
+        """
+        vectors_path, keys_path = snapshot_paths(data_path, model, dimensions)
+        if not (vectors_path.exists() and keys_path.exists()):
+            return None
+        vectors = np.load(vectors_path, mmap_mode="r")
+        keys = np.load(keys_path, mmap_mode="r")
+        if vectors.dtype != np.float32 or vectors.shape != (len(keys), dimensions):
+            logger.warning(f"Ignoring embedding snapshot {vectors_path}: unexpected shape {vectors.shape}")
+            return None
+        return cls(vectors, keys)
+
+    def lookup(self, hashes: list[str]) -> tuple[list[int], np.ndarray]:
+        """
+        Gather the stored vectors of a batch of records.
+
+        Args:
+            hashes: Record hashes of the batch.
+
+        Returns:
+            The positions in ``hashes`` found in the snapshot and their vectors, one row per position.
+        """
+        positions, rows = [], []
+        for position, content_hash in enumerate(hashes):
+            if (row := self.rows.get(content_hash)) is not None:
+                positions.append(position)
+                rows.append(row)
+        return positions, self.vectors[rows]
+
+
+async def _write_vectors(
+    path: Path,
+    data_path: Path,
+    rows: dict[str, int],
+    dense_embedding: OpenAIEmbeddings,
+    previous: EmbeddingSnapshot | None,
+    batch_size: int,
+    concurrency: int,
+) -> int:
+    """Fill a new ``.npy`` file with one vector per row, returning how many were copied from ``previous``."""
+    vectors = np.lib.format.open_memmap(
+        path, mode="w+", dtype=np.float32, shape=(len(rows), settings.OPENAI_EMBEDDING_DIMENSIONS)
+    )
+    queue: asyncio.Queue[list[tuple[int, str]] | None] = asyncio.Queue(maxsize=concurrency)
+    reused = 0
+
+    async def produce():
+        nonlocal reused
+        batch, written = [], set()
+        async for record in aiter_json_array(data_path):
+            content_hash = record_hash(record)
+            if content_hash in written:
+                continue
+            written.add(content_hash)
+            if previous is not None and (previous_row := previous.rows.get(content_hash)) is not None:
+                vectors[rows[content_hash]] = previous.vectors[previous_row]
+                reused += 1
+                continue
+            batch.append((rows[content_hash], record["full_summary"]))
+            if len(batch) == batch_size:
+                await queue.put(batch)
+                batch = []
+        if batch:
+            await queue.put(batch)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def consume():
+        while (batch := await queue.get()) is not None:
+            embedded = await dense_embedding.aembed_documents([text for _, text in batch])
+            vectors[[row for row, _ in batch]] = np.asarray(embedded, dtype=np.float32)
+
+    async with asyncio.TaskGroup() as group:
+        group.create_task(produce())
+        for _ in range(concurrency):
+            group.create_task(consume())
+
+    vectors.flush()
+    return reused
+
+
+async def export_embeddings(
+    data_path: Path = VECTOR_DATA_PATH,
+    batch_size: int = settings.INGEST_BATCH_SIZE,
+    concurrency: int = settings.INGEST_CONCURRENCY,
+) -> Path:
+    """
+    Embed every record of a dataset and write the snapshot next to it.
+
+    Vectors already present in a previous snapshot are copied over, so only new or edited records are embedded.
+    The files are written under a temporary name and moved into place once complete.
+
+    Args:
+        data_path: JSON file holding an array of case records with a ``full_summary`` field.
+        batch_size: Number of records embedded per call.
+        concurrency: Number of embedding calls in flight.
+
+    Returns:
+        Path of the vectors file.
+    """
+    dense_embedding = OpenAIEmbeddings(
+        model=settings.OPENAI_EMBEDDING_MODEL, dimensions=settings.OPENAI_EMBEDDING_DIMENSIONS
+    )
+    previous = EmbeddingSnapshot.open(data_path)
+
+    rows: dict[str, int] = {}
+    async for record in aiter_json_array(data_path):
+        rows.setdefault(record_hash(record), len(rows))
+
+    vectors_path, keys_path = snapshot_paths(data_path)
+    partial_vectors_path = vectors_path.with_suffix(".partial")
+    reused = await _write_vectors(
+        partial_vectors_path, data_path, rows, dense_embedding, previous, batch_size=batch_size, concurrency=concurrency
+    )
+    partial_keys_path = keys_path.with_suffix(".partial")
+    with open(partial_keys_path, "wb") as keys_file:
+        np.save(keys_file, np.array(list(rows), dtype=f"S{len(record_hash({}))}"))
+    os.replace(partial_vectors_path, vectors_path)
+    os.replace(partial_keys_path, keys_path)
+    logger.info(f"Exported {len(rows)} embeddings to {vectors_path} ({reused} reused from the previous snapshot)")
+    return vectors_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the case dataset embeddings to a snapshot file.")
+    parser.add_argument("--data", type=Path, default=VECTOR_DATA_PATH, help="JSON array of case records")
+    parser.add_argument("--batch-size", type=int, default=settings.INGEST_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=settings.INGEST_CONCURRENCY)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(export_embeddings(args.data, batch_size=args.batch_size, concurrency=args.concurrency))
@@ -1,12 +1,22 @@
-import io
-import json
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import Counter, OrderedDict
+from contextlib import asynccontextmanager
 from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable
 
 import aiofiles
+import httpx
+import numpy as np
 from langchain.schema import Document
+from langchain_core.prompts import BasePromptTemplate, aformat_document
 from langchain_openai import OpenAIEmbeddings
 from langchain_qdrant import QdrantVectorStore
-from qdrant_client import AsyncQdrantClient, QdrantClient, models
+from pydantic import BaseModel
+from qdrant_client import AsyncQdrantClient, models
 from qdrant_client.http.exceptions import ApiException
 from tenacity import (
     retry,
@@ -17,38 +27,275 @@ from tenacity import (
 )
 
 from src.core.config import get_settings
+from src.services.llm.registry import connection_limits as llm_connection_limits
+from src.services.llm.scheduler import openai_http_client
+from src.services.qdrant.records import VECTOR_DATA_PATH, aiter_json_array, point_id, record_hash
+from src.services.qdrant.snapshot import EmbeddingSnapshot
 
 settings = get_settings()
 
+logger = logging.getLogger(__name__)
+
+
+def connection_limits() -> httpx.Limits:
+    """Bounded keep-alive pool shared by the sync and async Qdrant clients."""
+    return httpx.Limits(
+        max_connections=settings.QDRANT_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.QDRANT_MAX_KEEPALIVE_CONNECTIONS,
+    )
+
+
+class IngestionReport(BaseModel):
+    records: int = 0
+    batches: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    seconds: float = 0.0
+
+    @property
+    def records_per_second(self) -> float:
+        return self.records / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        return (
+            f"{self.records} records in {self.batches} batches, {self.unchanged} unchanged, {self.deleted} deleted, "
+            f"{self.seconds:.1f}s ({self.records_per_second:.1f} records/s)"
+        )
+
+
+class IngestionProgress:
+    """Accumulates ingestion counters and logs throughput at most every ``log_interval`` seconds."""
+
+    def __init__(self, collection_name: str, log_interval: float = 5.0):
+        self.collection_name = collection_name
+        self.log_interval = log_interval
+        self.report = IngestionReport()
+        self._started = time.perf_counter()
+        self._last_log = self._started
+
+    def add(self, records: int) -> None:
+        now = time.perf_counter()
+        self.report.records += records
+        self.report.batches += 1
+        self.report.seconds = now - self._started
+        if now - self._last_log >= self.log_interval:
+            self._last_log = now
+            logger.info(f"Ingesting into {self.collection_name}: {self.report}")
+
+    def finish(self) -> IngestionReport:
+        self.report.seconds = time.perf_counter() - self._started
+        logger.info(f"Ingested into {self.collection_name}: {self.report}")
+        return self.report
+
+
+class MemmapEmbeddingStore:
+    """
+    Fixed-size ring of embeddings kept in memory-mapped files so cached vectors survive restarts.
+
+    ``vectors-<dims>.f32`` holds one float32 row per slot, ``keys-<dims>.bin`` the 32-byte content hash of the
+    row and ``cursor-<dims>.bin`` the next slot to overwrite. Once the ring is full the oldest slot is reused.
+    """
+
+    key_size = hashlib.sha256().digest_size
+
+    def __init__(self, directory: Path, dimensions: int, slots: int):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.slots = slots
+        self.vectors = self._open(directory / f"vectors-{dimensions}.f32", np.float32, (slots, dimensions))
+        self.keys = self._open(directory / f"keys-{dimensions}.bin", np.uint8, (slots, self.key_size))
+        self.cursor = self._open(directory / f"cursor-{dimensions}.bin", np.int64, (1,))
+        self.index = {self.keys[slot].tobytes(): int(slot) for slot in np.flatnonzero(self.keys.any(axis=1))}
+
+    @staticmethod
+    def _open(path: Path, dtype: type, shape: tuple[int, ...]) -> np.memmap:
+        expected_size = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        mode = "r+" if path.exists() and path.stat().st_size == expected_size else "w+"
+        return np.memmap(path, dtype=dtype, mode=mode, shape=shape)
+
+    def get(self, key: bytes) -> np.ndarray | None:
+        slot = self.index.get(key)
+        return None if slot is None else np.array(self.vectors[slot])
+
+    def put(self, key: bytes, vector: np.ndarray) -> None:
+        if key in self.index:
+            return
+        slot = int(self.cursor[0] % self.slots)
+        self.index.pop(self.keys[slot].tobytes(), None)
+        # clear the old key on disk before touching the vector, and write the new key last, so a crash in between
+        # leaves an empty slot after a restart instead of a key mapped to another or half-written vector
+        self.keys[slot] = 0
+        self.keys.flush()
+        self.vectors[slot] = vector
+        self.vectors.flush()
+        self.keys[slot] = np.frombuffer(key, dtype=np.uint8)
+        self.cursor[0] += 1
+        self.index[key] = slot
+
+    def flush(self) -> None:
+        for array in (self.vectors, self.keys, self.cursor):
+            array.flush()
+
+
+class EmbeddingCache:
+    """
+    Content-hash keyed cache for query embeddings.
+
+    Recent embeddings are kept as float32 arrays in an in-memory LRU bounded by ``max_bytes``. When ``directory``
+    is set every embedding is also written to a :class:`MemmapEmbeddingStore`, which backs LRU misses and survives
+    restarts. Concurrent misses for the same text share a single embedding call.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        dimensions: int,
+        max_bytes: int = settings.EMBEDDING_CACHE_MAX_BYTES,
+        directory: str | Path | None = settings.EMBEDDING_CACHE_DIR,
+        disk_slots: int = settings.EMBEDDING_CACHE_DISK_SLOTS,
+    ):
+        self.model = model
+        self.dimensions = dimensions
+        self.max_bytes = max_bytes
+        self.disk = MemmapEmbeddingStore(Path(directory), dimensions, disk_slots) if directory else None
+        self._entries: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self._pending: dict[bytes, asyncio.Future] = {}
+        self._size = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> bytes:
+        """Hash the whitespace-normalized text together with the model it is embedded with."""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{self.model}:{self.dimensions}:{normalized}".encode()).digest()
+
+    def __contains__(self, key: bytes) -> bool:
+        """Tell whether ``key`` is cached without counting a hit or refreshing its LRU position."""
+        return key in self._entries or (self.disk is not None and key in self.disk.index)
+
+    def get(self, key: bytes) -> np.ndarray | None:
+        vector = self._entries.get(key)
+        if vector is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector
+        if self.disk is not None and (vector := self.disk.get(key)) is not None:
+            self._remember(key, vector)
+            self.disk_hits += 1
+            return vector
+        return None
+
+    def put(self, key: bytes, vector: list[float] | np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        self._remember(key, vector)
+        if self.disk is not None:
+            self.disk.put(key, vector)
+        return vector
+
+    def _remember(self, key: bytes, vector: np.ndarray) -> None:
+        if vector.nbytes > self.max_bytes:
+            return
+        if (previous := self._entries.pop(key, None)) is not None:
+            self._size -= previous.nbytes
+        self._entries[key] = vector
+        self._size += vector.nbytes
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.nbytes
+
+    async def aget_or_embed(self, text: str, embed: Callable[[str], Awaitable[list[float]]]) -> np.ndarray:
+        """
+        Return the cached embedding for ``text`` or compute it with ``embed`` and cache it.
+
+        Args:
+            text: Text to embed.
+            embed: Coroutine function computing the embedding on a miss.
+
+        Returns:
+            The float32 embedding.
+        """
+        key = self.key(text)
+        if (vector := self.get(key)) is not None:
+            return vector
+        while (pending := self._pending.get(key)) is not None:
+            try:
+                vector = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # the request embedding this text was cancelled, embed it here instead of failing too
+                if not pending.cancelled():
+                    raise
+                continue
+            self.hits += 1
+            return vector
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            vector = self.put(key, await embed(text))
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # mark the exception retrieved so it is not reported when nobody else awaited it
+            future.exception()
+            raise
+        else:
+            future.set_result(vector)
+            return vector
+        finally:
+            del self._pending[key]
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "disk_entries": len(self.disk.index) if self.disk is not None else 0,
+        }
+
+    def flush(self) -> None:
+        if self.disk is not None:
+            self.disk.flush()
+
+
+embedding_cache = EmbeddingCache(
+    model=settings.OPENAI_EMBEDDING_MODEL,
+    dimensions=settings.OPENAI_EMBEDDING_DIMENSIONS,
+)
+
 
 class Qdrant:
     def __init__(
         self,
         index_name: str,
         disable_indexing: bool = False,
+        embedding_cache: EmbeddingCache | None = embedding_cache,
     ):
         self.collection_name = index_name
         self.disable_indexing = disable_indexing
+        self.embedding_http_client = openai_http_client(llm_connection_limits())
         self.dense_embedding = OpenAIEmbeddings(
-            model=settings.OPENAI_EMBEDDING_MODEL, dimensions=settings.OPENAI_EMBEDDING_DIMENSIONS
+            model=settings.OPENAI_EMBEDDING_MODEL,
+            dimensions=settings.OPENAI_EMBEDDING_DIMENSIONS,
+            http_async_client=self.embedding_http_client,
         )
         self.dimensions = settings.OPENAI_EMBEDDING_DIMENSIONS
+        self.embedding_cache = embedding_cache
         self.new_collection = False
-
-        # Initialize Qdrant client configuration
-        self.client = QdrantClient(
-            url=settings.QDRANT_URL,
-            port=None,
-            prefer_grpc=False,
-        )
+        self.manifest_path = Path(settings.QDRANT_MANIFEST_DIR or VECTOR_DATA_PATH.parent) / f".{index_name}.manifest"
 
         # Initialize Qdrant asynchronous client configuration
         self.async_client = AsyncQdrantClient(
             url=settings.QDRANT_URL,
             port=None,
             prefer_grpc=False,
+            timeout=settings.QDRANT_TIMEOUT,
+            limits=connection_limits(),
         )
-        self.middle_ware = None
 
     async def __aenter__(self):
         await self.initialize_vectorstore()
@@ -58,23 +305,370 @@ class Qdrant:
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self.disable_indexing:
-            await self.set_indexing_threshold(indexing_threshold=20000)
+            await self.set_indexing_threshold(indexing_threshold=settings.QDRANT_INDEXING_THRESHOLD)
         return not exc_type
 
+    async def close(self) -> None:
+        """Close the Qdrant and embedding clients and release their connection pools."""
+        await self.async_client.close()
+        await self.embedding_http_client.aclose()
+
     def validate(self):
         if not self.dense_embedding:
             raise ValueError("Invalid Embedding Models")
 
-    async def load_vector_data(self):
-        async with aiofiles.open(
-            Path(__file__).parent / "data/qdrant_data.json",
-            "rb",
-        ) as json_file:
-            file_data = await json_file.read()
-            json_data = json.load(io.BytesIO(file_data))
-            vector_data = [Document(page_content=data.pop("full_summary"), metadata=data) for data in json_data]
-            await self.middle_ware.aadd_documents(vector_data)
-            self.new_collection = False
+    async def load_vector_data(self, path: Path = VECTOR_DATA_PATH) -> IngestionReport:
+        """
+        Stream the case dataset into the collection in bulk-load mode.
+
+        Indexing is switched off while the batches are upserted and restored afterwards, then the method waits
+        for the optimizer so the collection is fully indexed before it is served.
+
+        Args:
+            path: JSON file holding an array of case records with a ``full_summary`` field.
+
+        Returns:
+            Counters and throughput of the ingestion.
+        """
+        await self.set_indexing_threshold(indexing_threshold=0)
+        try:
+            report = await self.sync_vector_data(path, ingested=set())
+        finally:
+            if not self.disable_indexing:
+                await self.set_indexing_threshold(indexing_threshold=settings.QDRANT_INDEXING_THRESHOLD)
+        if not self.disable_indexing:
+            await self.wait_for_optimizer()
+        self.new_collection = False
+        return report
+
+    async def sync_vector_data(
+        self, path: Path = VECTOR_DATA_PATH, ingested: set[str] | None = None
+    ) -> IngestionReport:
+        """
+        Bring the collection in line with the case dataset, embedding only what changed.
+
+        Every record is stored under a point ID derived from its content hash. Records whose hash is already in
+        the manifest are skipped, new or edited records are embedded and upserted, and points whose hash is no
+        longer in the dataset are deleted, so a re-index costs only the size of the diff.
+
+        Args:
+            path: JSON file holding an array of case records.
+            ingested: Hashes already stored in the collection, read from the manifest when omitted.
+
+        Returns:
+            Counters and throughput of the sync.
+        """
+        stray_ids: list[str] = []
+        if ingested is None:
+            ingested, stray_ids = await self.load_manifest()
+        current: set[str] = set()
+        unchanged = 0
+
+        async def changed_records():
+            nonlocal unchanged
+            async for record in aiter_json_array(path):
+                content_hash = record_hash(record)
+                if content_hash in current:
+                    continue
+                current.add(content_hash)
+                if content_hash in ingested:
+                    unchanged += 1
+                    continue
+                yield record
+
+        snapshot = EmbeddingSnapshot.open(path, model=self.dense_embedding.model, dimensions=self.dimensions)
+        report = await self.ingest(changed_records(), snapshot=snapshot)
+        removed = [point_id(content_hash) for content_hash in ingested - current] + stray_ids
+        for start in range(0, len(removed), settings.INGEST_BATCH_SIZE):
+            await self.delete_points(removed[start : start + settings.INGEST_BATCH_SIZE])
+        await self.save_manifest(current)
+
+        report.unchanged = unchanged
+        report.deleted = len(removed)
+        logger.info(f"Synced {self.collection_name}: {report}")
+        return report
+
+    async def load_manifest(self) -> tuple[set[str], list[str]]:
+        """
+        Read the hashes of the ingested records.
+
+        The manifest file is trusted when the collection holds exactly the points derived from its hashes: as many
+        points as hashes, all of them found by ID. Otherwise it is rebuilt by scrolling the collection, which also
+        returns points not stored under their content hash (e.g. ingested before IDs were deterministic) so they
+        can be removed.
+
+        Returns:
+            The ingested hashes and the IDs of stray points.
+        """
+        hashes: set[str] = set()
+        if self.manifest_path.exists():
+            async with aiofiles.open(self.manifest_path) as manifest:
+                hashes = {line.strip() async for line in manifest if line.strip()}
+        if await self.manifest_matches(hashes):
+            return hashes, []
+
+        logger.info(f"Manifest of {self.collection_name} is out of date, rebuilding it from the collection")
+        hashes, stray_ids, offset = set(), [], None
+        while True:
+            points, offset = await self.async_client.scroll(
+                collection_name=self.collection_name,
+                limit=1000,
+                offset=offset,
+                with_payload=["record_hash"],
+                with_vectors=False,
+            )
+            for point in points:
+                content_hash = (point.payload or {}).get("record_hash")
+                if content_hash and str(point.id) == point_id(content_hash):
+                    hashes.add(content_hash)
+                else:
+                    stray_ids.append(str(point.id))
+            if offset is None:
+                return hashes, stray_ids
+
+    async def manifest_matches(self, hashes: set[str], batch_size: int = 1000) -> bool:
+        """Check that the points of the collection are exactly those stored under the given hashes."""
+        count = await self.async_client.count(collection_name=self.collection_name, exact=True)
+        if count.count != len(hashes):
+            return False
+        point_ids = [point_id(content_hash) for content_hash in hashes]
+        for start in range(0, len(point_ids), batch_size):
+            batch = point_ids[start : start + batch_size]
+            found = await self.async_client.count(
+                collection_name=self.collection_name,
+                count_filter=models.Filter(must=[models.HasIdCondition(has_id=batch)]),
+                exact=True,
+            )
+            if found.count != len(batch):
+                return False
+        return True
+
+    async def save_manifest(self, hashes: set[str]) -> None:
+        """Atomically replace the manifest with the given hashes."""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        # one temporary file per process, so workers syncing at the same time do not write into each other's
+        partial_path = self.manifest_path.with_name(f"{self.manifest_path.name}.{os.getpid()}.partial")
+        async with aiofiles.open(partial_path, "w") as manifest:
+            await manifest.write("".join(f"{content_hash}\n" for content_hash in sorted(hashes)))
+        os.replace(partial_path, self.manifest_path)
+
+    async def ingest(
+        self,
+        records: AsyncIterator[dict],
+        batch_size: int = settings.INGEST_BATCH_SIZE,
+        concurrency: int = settings.INGEST_CONCURRENCY,
+        snapshot: EmbeddingSnapshot | None = None,
+    ) -> IngestionReport:
+        """
+        Embed and upsert records in fixed-size batches with a bounded number of concurrent workers.
+
+        The reader blocks once ``concurrency`` batches are queued, so memory stays flat whatever the number of
+        records.
+
+        Args:
+            records: Case records, each holding the text to embed under ``full_summary``.
+            batch_size: Number of records embedded and upserted together.
+            concurrency: Number of batches in flight.
+            snapshot: Precomputed embeddings used instead of the embedding API for the records it holds.
+
+        Returns:
+            Counters and throughput of the ingestion.
+        """
+        progress = IngestionProgress(self.collection_name)
+        queue: asyncio.Queue[list[dict] | None] = asyncio.Queue(maxsize=concurrency)
+
+        async def produce():
+            batch = []
+            async for record in records:
+                batch.append(record)
+                if len(batch) == batch_size:
+                    await queue.put(batch)
+                    batch = []
+            if batch:
+                await queue.put(batch)
+            for _ in range(concurrency):
+                await queue.put(None)
+
+        async def consume():
+            while (batch := await queue.get()) is not None:
+                await self.upsert_records(batch, snapshot=snapshot)
+                progress.add(len(batch))
+
+        async with asyncio.TaskGroup() as group:
+            group.create_task(produce())
+            for _ in range(concurrency):
+                group.create_task(consume())
+        return progress.finish()
+
+    async def upsert_records(self, records: list[dict], snapshot: EmbeddingSnapshot | None = None) -> None:
+        """Embed one batch of case records and upsert it in the ``QdrantVectorStore`` payload layout."""
+        hashes = [record_hash(record) for record in records]
+        texts = [record.pop("full_summary") for record in records]
+        vectors = await self.embed_records(hashes, texts, snapshot=snapshot)
+        await self.upsert_points(
+            [
+                models.PointStruct(
+                    id=point_id(content_hash),
+                    vector={"dense": vector},
+                    payload={
+                        QdrantVectorStore.CONTENT_KEY: text,
+                        QdrantVectorStore.METADATA_KEY: record,
+                        "record_hash": content_hash,
+                    },
+                )
+                for content_hash, text, vector, record in zip(hashes, texts, vectors, records, strict=True)
+            ]
+        )
+
+    async def embed_records(
+        self,
+        hashes: list[str],
+        texts: list[str],
+        snapshot: EmbeddingSnapshot | None = None,
+    ) -> list[list[float]]:
+        """
+        Take the vectors of a batch from the snapshot and embed only the records it does not hold.
+
+        The snapshot rows are converted to lists once here. ``PointStruct`` validates vectors into ``list[float]``
+        for the JSON body of the REST upsert anyway, and handed ndarray rows it converts them element by element,
+        about 30 times slower than a single ``tolist()`` on the gathered batch.
+        """
+        if snapshot is None:
+            return await self.dense_embedding.aembed_documents(texts)
+
+        vectors: list[list[float] | None] = [None] * len(texts)
+        positions, stored = snapshot.lookup(hashes)
+        for position, vector in zip(positions, stored.tolist(), strict=True):
+            vectors[position] = vector
+        if missing := [position for position, vector in enumerate(vectors) if vector is None]:
+            embedded = await self.dense_embedding.aembed_documents([texts[position] for position in missing])
+            for position, vector in zip(missing, embedded, strict=True):
+                vectors[position] = vector
+        return vectors
+
+    @retry(
+        retry=retry_if_exception_type(ApiException),
+        stop=(stop_after_delay(10) | stop_after_attempt(5)),
+        wait=wait_random(1, 10),
+    )
+    async def upsert_points(self, points: list[models.PointStruct]) -> None:
+        await self.async_client.upsert(collection_name=self.collection_name, points=points, wait=False)
+
+    @retry(
+        retry=retry_if_exception_type(ApiException),
+        stop=(stop_after_delay(10) | stop_after_attempt(5)),
+        wait=wait_random(1, 10),
+    )
+    async def delete_points(self, point_ids: list[str]) -> None:
+        await self.async_client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.PointIdsList(points=point_ids),
+            wait=False,
+        )
+
+    async def wait_for_optimizer(
+        self,
+        timeout: float = settings.QDRANT_OPTIMIZER_TIMEOUT,
+        poll_interval: float = 1.0,
+    ) -> None:
+        """
+        Poll the collection until the optimizer has finished indexing it.
+
+        The collection keeps serving searches while it is optimized, so a timeout is only logged.
+        """
+        try:
+            async with asyncio.timeout(timeout):
+                while True:
+                    collection = await self.async_client.get_collection(self.collection_name)
+                    if collection.status == models.CollectionStatus.GREEN:
+                        return
+                    await asyncio.sleep(poll_interval)
+        except TimeoutError:
+            logger.warning(f"Optimizer for {self.collection_name} still running after {timeout}s")
+
+    @staticmethod
+    def search_params() -> models.SearchParams:
+        """Binary-quantized search rescored against the original vectors."""
+        return models.SearchParams(
+            quantization=models.QuantizationSearchParams(
+                ignore=False,
+                rescore=True,
+                oversampling=settings.OVERSAMPLING_FACTOR,
+            )
+        )
+
+    async def asimilarity_search(
+        self,
+        query: str,
+        k: int = settings.MAX_RELEVANT_MATCHES,
+        search_params: models.SearchParams | None = None,
+    ) -> list[Document]:
+        """
+        Asynchronously searches the collection for the documents most similar to the query.
+
+        Both the query embedding and the Qdrant query run on the event loop, so a slow search never blocks
+        the other agents served by the same process.
+
+        Args:
+            query: Free text to search for.
+            k: Number of documents to return.
+            search_params: Qdrant search parameters, defaults to :meth:`search_params`.
+
+        Returns:
+            The matching documents, best match first.
+        """
+        query_vector = await self.aembed_query(query)
+        response = await self.async_client.query_points(
+            collection_name=self.collection_name,
+            query=query_vector,
+            using="dense",
+            limit=k,
+            search_params=search_params or self.search_params(),
+            with_payload=True,
+        )
+        return [self.document_from_point(point) for point in response.points]
+
+    async def aembed_query(self, query: str) -> list[float]:
+        """Embed the query, serving repeated queries from the embedding cache when one is configured."""
+        if self.embedding_cache is None:
+            return await self.dense_embedding.aembed_query(query)
+        vector = await self.embedding_cache.aget_or_embed(query, self.dense_embedding.aembed_query)
+        return vector.tolist()
+
+    async def aembed_queries(self, queries: list[str]) -> None:
+        """Embed the queries missing from the embedding cache in a single request, so searching for them hits it."""
+        if self.embedding_cache is None:
+            return
+        missing = {}
+        for query in queries:
+            key = self.embedding_cache.key(query)
+            if key not in missing and key not in self.embedding_cache:
+                missing[key] = query
+        if not missing:
+            return
+        # the searches that follow count as hits, so the embeddings computed here are the misses
+        self.embedding_cache.misses += len(missing)
+        vectors = await self.dense_embedding.aembed_documents(list(missing.values()))
+        for key, vector in zip(missing, vectors, strict=True):
+            self.embedding_cache.put(key, vector)
+
+    def document_from_point(self, point: models.ScoredPoint) -> Document:
+        """Build a ``Document`` from a point stored in the ``QdrantVectorStore`` payload layout."""
+        payload = point.payload or {}
+        metadata = payload.get(QdrantVectorStore.METADATA_KEY) or {}
+        metadata["_id"] = point.id
+        metadata["_collection_name"] = self.collection_name
+        return Document(page_content=payload.get(QdrantVectorStore.CONTENT_KEY, ""), metadata=metadata)
+
+    @staticmethod
+    async def aformat_documents(
+        documents: list[Document],
+        document_prompt: BasePromptTemplate,
+        document_separator: str = "\n",
+    ) -> str:
+        """Render each document with ``document_prompt`` and join them with ``document_separator``."""
+        formatted = await asyncio.gather(*(aformat_document(document, document_prompt) for document in documents))
+        return document_separator.join(formatted)
 
     async def load_index(self):
         """
@@ -222,31 +816,142 @@ class Qdrant:
         stop=(stop_after_delay(10) | stop_after_attempt(5)),
         wait=wait_random(1, 10),
     )
-    async def initialize_vectorstore(self) -> None:
+    async def initialize_vectorstore(self, sync: bool = settings.QDRANT_SYNC_ON_STARTUP) -> None:
         """
-        Initialize the Qdrant VectorStore with the specified embedding models and
-        retrieval mode.
+        Initialize the Qdrant collection the text embeddings are stored in and queried from.
+
+        This method loads the index, creating the collection when it does not exist, and
+        loads or syncs the case dataset into it.
 
-        This method loads the index and creates a new Qdrant VectorStore with the
-        specified embedding models and retrieval mode. The VectorStore is used
-        to store and query the text embeddings in the Qdrant cluster.
+        Args:
+            sync: Delta-sync an existing collection with the case dataset. A new collection is always loaded.
 
         Returns:
             None
         """
-        # Load the index before creating the VectorStore
         await self.load_index()
 
-        # Create a new VectorStore with the specified embedding models and retrieval mode
-
-        self.middle_ware = QdrantVectorStore(
-            client=self.client,
-            embedding=self.dense_embedding,
-            collection_name=self.collection_name,
-            validate_embeddings=False,  # skip embedding check call
-            validate_collection_config=False,  # skip index validation call
-            vector_name="dense",
-        )
-
         if self.new_collection:
             await self.load_vector_data()
+        elif sync:
+            await self.sync_vector_data()
+
+
+class VectorStorePool:
+    """
+    Process-wide :class:`Qdrant` handle shared by every agent in the worker.
+
+    The handle is opened once from the FastAPI lifespan, so the clients and the embedding model are built a
+    single time and the per-query cost is only the embedding and the search. The collection is re-checked at most
+    every ``QDRANT_HEALTH_CHECK_INTERVAL`` seconds; when the check fails the handle is rebuilt (re-creating and
+    re-loading the collection if it went missing). A replaced handle is closed once the last request that borrowed
+    it is done with it.
+    """
+
+    def __init__(self, index_name: str, health_check_interval: float = settings.QDRANT_HEALTH_CHECK_INTERVAL):
+        self.index_name = index_name
+        self.health_check_interval = health_check_interval
+        self._vector_db: Qdrant | None = None
+        self._last_health_check = 0.0
+        self._lock = asyncio.Lock()
+        self._borrowers: Counter[Qdrant] = Counter()
+        self._retired: set[Qdrant] = set()
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def open(self) -> Qdrant:
+        """Create and initialize the shared handle if it does not exist yet."""
+        async with self._lock:
+            if self._vector_db is None:
+                vector_db = Qdrant(index_name=self.index_name)
+                await vector_db.initialize_vectorstore()
+                self._vector_db = vector_db
+                self._last_health_check = time.monotonic()
+            return self._vector_db
+
+    async def acquire(self) -> Qdrant:
+        """
+        Return the shared handle, opening it lazily and re-checking its health when the last check is stale.
+
+        The handle may be replaced and closed by a later health check; requests that keep using it across awaits
+        take it with :meth:`borrow` instead.
+
+        Returns:
+            The initialized :class:`Qdrant` instance.
+        """
+        if self._vector_db is None:
+            return await self.open()
+        if time.monotonic() - self._last_health_check >= self.health_check_interval:
+            await self._check_health()
+        return self._vector_db
+
+    @asynccontextmanager
+    async def borrow(self) -> AsyncIterator[Qdrant]:
+        """
+        Hold the shared handle for the duration of the block.
+
+        A health check replacing the handle in the meantime leaves it open until the block exits.
+
+        Yields:
+            The initialized :class:`Qdrant` instance.
+        """
+        vector_db = await self.acquire()
+        self._borrowers[vector_db] += 1
+        try:
+            yield vector_db
+        finally:
+            self._borrowers[vector_db] -= 1
+            if not self._borrowers[vector_db]:
+                del self._borrowers[vector_db]
+                if vector_db in self._retired:
+                    self._retired.discard(vector_db)
+                    await vector_db.close()
+
+    async def _retire(self, vector_db: Qdrant) -> None:
+        """Close a replaced handle now, or when its last borrower returns it."""
+        if self._borrowers[vector_db]:
+            self._retired.add(vector_db)
+        else:
+            await vector_db.close()
+
+    async def _check_health(self) -> None:
+        async with self._lock:
+            # another request may have refreshed the handle while this one waited for the lock
+            if time.monotonic() - self._last_health_check < self.health_check_interval:
+                return
+            self._last_health_check = time.monotonic()
+            try:
+                if await self._vector_db.collection_exists(self.index_name):
+                    return
+                logger.warning(f"Qdrant collection {self.index_name} is missing, re-initializing the vector store")
+            except Exception as e:
+                logger.warning(f"Qdrant health check failed, re-initializing the vector store: {e}")
+
+            vector_db = Qdrant(index_name=self.index_name)
+            try:
+                # the dataset was synced when the pool was opened, only a missing collection is loaded again
+                await vector_db.initialize_vectorstore(sync=False)
+            except Exception as e:
+                logger.error(f"Failed to re-initialize the vector store, keeping the current handle: {e}")
+                await vector_db.close()
+                return
+            stale, self._vector_db = self._vector_db, vector_db
+            await self._retire(stale)
+
+    async def close(self) -> None:
+        """Close the shared handle and any replaced one still borrowed; the next :meth:`acquire` opens a fresh one."""
+        async with self._lock:
+            if self._vector_db is not None:
+                await self._vector_db.close()
+                self._vector_db = None
+            while self._retired:
+                await self._retired.pop().close()
+            embedding_cache.flush()
+
+
+vector_store = VectorStorePool(index_name=settings.QDRANT_COLLECTION)
@@ -0,0 +1,103 @@
+"""
+Rule-based admission decisions computed directly from the resource store
+"""
+
+import json
+import re
+from typing import Any, List, Optional
+
+from src.services.resources.ledger import ReservationLedger, reservation_ledger
+from src.services.resources.store import DepartmentResources, ResourceStore
+
+
+def department_of(emergency_sheet: Any) -> Optional[str]:
+    """Return the ``department`` field of an emergency checklist given as a dict or a JSON string."""
+    if isinstance(emergency_sheet, str):
+        try:
+            emergency_sheet = json.loads(emergency_sheet)
+        except ValueError:
+            return None
+    if isinstance(emergency_sheet, dict) and isinstance(emergency_sheet.get("department"), str):
+        return emergency_sheet["department"]
+    return None
+
+
+def match_departments(store: ResourceStore, text: str) -> List[DepartmentResources]:
+    """
+    Return the departments of the store named in a free text.
+
+    Names only match whole words, so ``ICU`` is not found in ``difficulty``. Department names that are part of a
+    longer match (``Gastroenterology`` inside ``Gastroenterology & Hepatology``) are dropped.
+    """
+    matches = [
+        resources
+        for resources in store.departments
+        if re.search(rf"\b{re.escape(resources.name)}\b", text, re.IGNORECASE)
+    ]
+    return [
+        resources
+        for resources in matches
+        if not any(resources is not other and resources.name.lower() in other.name.lower() for other in matches)
+    ]
+
+
+def resolve_department(store: ResourceStore, department: Optional[str]) -> Optional[DepartmentResources]:
+    """
+    Match a free-text department against the departments of the store.
+
+    An exact, case-insensitive match wins, otherwise the text must name exactly one department.
+
+    Returns:
+        The department, or None when there is no match or several unrelated ones.
+    """
+    if not department:
+        return None
+    if (resources := store.department(department)) is not None:
+        return resources
+    matches = match_departments(store, department)
+    return matches[0] if len(matches) == 1 else None
+
+
+async def allocate(
+    store: ResourceStore, emergency_sheet: Any, ledger: ReservationLedger = reservation_ledger
+) -> Optional[dict]:
+    """
+    Decide the admission of a patient the way ``resource_availability_check`` instructs the LLM to.
+
+    The lowest-numbered free bed is reserved, or else the lowest-numbered free stretcher, together with an available
+    doctor of the department. When the department has no free bed or stretcher, or no doctor, the patient is
+    redirected to the best-rated hospital listing that department.
+
+    Args:
+        store: Loaded resource store.
+        emergency_sheet: Emergency checklist holding the ``department`` of the patient.
+        ledger: Ledger holding the resources already handed out.
+
+    Returns:
+        The decision in the layout of ``ResourceAvailability``, or None when the department cannot be resolved and
+        the decision has to be left to the LLM.
+    """
+    resources = resolve_department(store, department_of(emergency_sheet))
+    if resources is None:
+        return None
+
+    if (reservation := await ledger.reserve(resources)) is not None:
+        return {
+            "admission_status": "Accepted",
+            "assigned_resource": [{"type": reservation.type, "number": str(reservation.number)}],
+            "assigned_doctor": reservation.doctor,
+            "reason": f"{reservation.type.capitalize()} {reservation.number} is available in {resources.name}.",
+            "suggested_hospital": "",
+            "reservation_id": reservation.id,
+        }
+
+    shortage = "no bed or stretcher is available" if resources.doctors else "no doctor is available"
+    hospital = next(iter(store.redirects(resources.name)), None)
+    return {
+        "admission_status": "Redirected",
+        "assigned_resource": [],
+        "assigned_doctor": "",
+        "reason": f"In {resources.name} {shortage}"
+        + (f"; {hospital.name} has the best-rated {resources.name} department." if hospital else "."),
+        "suggested_hospital": hospital.name if hospital else "",
+    }
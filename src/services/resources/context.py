@@ -0,0 +1,137 @@
+"""
+Selection of the resource and hospital rows embedded in the resource and appointment prompts
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+import tiktoken
+
+from src.core.config import get_settings
+from src.services.resources.allocator import department_of, resolve_department
+from src.services.resources.store import DepartmentResources, ResourceStore
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+class Tokenizer:
+    """Counts prompt tokens with the tokenizer of ``model``, estimating them at four characters per token until loaded."""
+
+    def __init__(self, model: str = settings.PROMPT_TOKENIZER_MODEL):
+        self.model = model
+        self.encoding: Optional[tiktoken.Encoding] = None
+
+    async def load(self) -> None:
+        """Load the encoding in a worker thread, as tiktoken downloads its BPE file on first use."""
+        try:
+            self.encoding = await asyncio.to_thread(tiktoken.encoding_for_model, self.model)
+        except Exception as e:
+            logger.warning(f"Token counts are estimated from characters, tokenizer unavailable: {e}")
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode(text)) if self.encoding is not None else len(text) // 4
+
+
+tokenizer = Tokenizer()
+
+
+def count_tokens(text: str) -> int:
+    """Count the tokens of ``text``, or estimate them while the tokenizer is not loaded."""
+    return tokenizer.count(text)
+
+
+def minify(rows: Any) -> str:
+    return json.dumps(rows, separators=(",", ":"), ensure_ascii=False)
+
+
+class ContextStats:
+    """Token counts of the prompt context per prompt, against what embedding every row would have cost."""
+
+    def __init__(self):
+        self.prompts: Dict[str, Dict[str, int]] = {}
+
+    def record(self, prompt: str, pruned: bool, full_tokens: int, tokens: int) -> None:
+        stats = self.prompts.setdefault(prompt, {"calls": 0, "pruned": 0, "full_tokens": 0, "tokens": 0})
+        stats["calls"] += 1
+        stats["pruned"] += pruned
+        stats["full_tokens"] += full_tokens
+        stats["tokens"] += tokens
+
+    def as_dict(self) -> Dict[str, Dict[str, int]]:
+        return {prompt: dict(stats) for prompt, stats in self.prompts.items()}
+
+
+context_stats = ContextStats()
+
+_full_tokens: Dict[str, Tuple[List[dict], int]] = {}
+
+
+def _full_context_tokens(name: str, rows: List[dict]) -> int:
+    """Tokens of ``rows`` rendered the way the prompts embedded them before pruning, cached until the rows reload."""
+    cached = _full_tokens.get(name)
+    if cached is None or cached[0] is not rows:
+        cached = _full_tokens[name] = (rows, count_tokens(str(rows)))
+    return cached[1]
+
+
+def _hospital_rows(store: ResourceStore, departments: List[DepartmentResources]) -> List[dict]:
+    """Hospitals listing one of ``departments``, keeping only the ratings of those departments."""
+    names = {department.name.lower() for department in departments}
+    rows = []
+    for hospital in store.hospital_rows:
+        ratings = [rating for rating in hospital["departments"] if rating["name"].lower() in names]
+        if ratings:
+            rows.append({**hospital, "departments": ratings})
+    return rows
+
+
+def prompt_context(store: ResourceStore, prompt: str, emergency_sheet: Any, hospitals: bool = True) -> Dict[str, str]:
+    """
+    Select the rows a prompt needs about the patient's department, minified.
+
+    The department is read from the ``department`` field of an emergency checklist, or else looked up by name in
+    the text of the sheet. When no department is found, the text names several, or pruning is disabled with
+    ``PROMPT_CONTEXT_PRUNING``, every row is kept.
+
+    Args:
+        store: Loaded resource store.
+        prompt: Name of the prompt, used in the token report.
+        emergency_sheet: Emergency checklist or patient case sheet.
+        hospitals: Whether the prompt also embeds the hospital list.
+
+    Returns:
+        ``resource_availability`` and, when ``hospitals`` is set, ``hospital_list`` as minified JSON.
+    """
+    departments = []
+    if settings.PROMPT_CONTEXT_PRUNING:
+        if (resources := resolve_department(store, department_of(emergency_sheet))) is not None:
+            departments = [resources]
+        else:
+            text = emergency_sheet if isinstance(emergency_sheet, str) else minify(emergency_sheet)
+            # a sheet naming several departments is ambiguous and keeps every row
+            if (resources := resolve_department(store, text)) is not None:
+                departments = [resources]
+
+    if departments:
+        context = {"resource_availability": minify([department.as_row() for department in departments])}
+        if hospitals:
+            context["hospital_list"] = minify(_hospital_rows(store, departments))
+    else:
+        context = {"resource_availability": minify(store.resource_rows)}
+        if hospitals:
+            context["hospital_list"] = minify(store.hospital_rows)
+
+    full_tokens = _full_context_tokens("resource_availability", store.resource_rows)
+    if hospitals:
+        full_tokens += _full_context_tokens("hospital_list", store.hospital_rows)
+    tokens = sum(count_tokens(text) for text in context.values())
+    context_stats.record(prompt, bool(departments), full_tokens, tokens)
+    logger.info(
+        f"{prompt} context: {tokens} tokens instead of {full_tokens}"
+        f" ({', '.join(department.name for department in departments) or 'all departments'})"
+    )
+    return context
@@ -0,0 +1,191 @@
+"""
+Reservations of the beds, stretchers and doctors handed out by the allocator
+"""
+
+import asyncio
+import logging
+import math
+import time
+import uuid
+from collections import Counter
+from typing import Dict, List, Literal, Optional, Tuple
+
+from src.core.config import get_settings
+from src.services.resources.store import DepartmentResources, lowest
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+
+class Reservation:
+    """
+    A bed or stretcher of a department held for one admission, together with the doctor assigned to it.
+
+    A reservation is pending until the admission is confirmed, and a confirmed one never expires.
+    """
+
+    __slots__ = ("id", "department", "type", "number", "doctor", "expires_at")
+
+    def __init__(self, department: str, type: Literal["bed", "stretcher"], number: int, doctor: str, expires_at: float):
+        self.id = uuid.uuid4().hex
+        self.department = department
+        self.type = type
+        self.number = number
+        self.doctor = doctor
+        self.expires_at = expires_at
+
+    @property
+    def confirmed(self) -> bool:
+        return self.expires_at == math.inf
+
+
+class _DepartmentLedger:
+    def __init__(self):
+        self.beds = 0
+        self.stretchers = 0
+        self.doctor_load: Counter[str] = Counter()
+        self.reservations: Dict[str, Reservation] = {}
+
+
+class ReservationLedger:
+    """
+    Tracks the resources handed out on top of the availability served by the resource store.
+
+    A reserved bed or stretcher is not handed out again until the reservation is released, when the patient is
+    discharged or transferred. A reservation that is not confirmed within ``ttl``, because the admission was never
+    completed, expires and its resources go back to the pool. Doctors are not exclusive: each reservation gets the
+    available doctor of the department holding the fewest reservations.
+
+    The ledger lives on the event loop and no operation awaits between reading and updating it, so each one is atomic
+    without a lock. Reservations are kept per department, so expiring those of one department never scans the others.
+    """
+
+    def __init__(self, ttl: float = settings.RESERVATION_TTL):
+        self.ttl = ttl
+        self._departments: Dict[str, _DepartmentLedger] = {}
+        self._owners: Dict[str, str] = {}
+
+    def _ledger(self, department: str) -> _DepartmentLedger:
+        key = department.lower()
+        if (ledger := self._departments.get(key)) is None:
+            ledger = self._departments[key] = _DepartmentLedger()
+        return ledger
+
+    def _drop(self, ledger: _DepartmentLedger, reservation: Reservation) -> None:
+        del ledger.reservations[reservation.id]
+        self._owners.pop(reservation.id, None)
+        if reservation.type == "bed":
+            ledger.beds &= ~(1 << reservation.number)
+        else:
+            ledger.stretchers &= ~(1 << reservation.number)
+        ledger.doctor_load[reservation.doctor] -= 1
+        if ledger.doctor_load[reservation.doctor] <= 0:
+            del ledger.doctor_load[reservation.doctor]
+
+    def _expire(self, ledger: _DepartmentLedger, now: float) -> int:
+        expired = [reservation for reservation in ledger.reservations.values() if reservation.expires_at <= now]
+        for reservation in expired:
+            self._drop(ledger, reservation)
+        return len(expired)
+
+    async def reserve(self, resources: DepartmentResources) -> Optional[Reservation]:
+        """
+        Hold the lowest-numbered free bed of a department, or else its lowest-numbered free stretcher.
+
+        Returns:
+            The pending reservation, or None when the department has no free bed or stretcher, or no doctor available.
+        """
+        ledger = self._ledger(resources.name)
+        now = time.monotonic()
+        self._expire(ledger, now)
+        if not resources.doctors:
+            return None
+        if free := resources.beds & ~ledger.beds:
+            kind, number = "bed", lowest(free)
+            ledger.beds |= 1 << number
+        elif free := resources.stretchers & ~ledger.stretchers:
+            kind, number = "stretcher", lowest(free)
+            ledger.stretchers |= 1 << number
+        else:
+            return None
+        # min keeps the first doctor listed among the least loaded ones
+        doctor = min(resources.doctors, key=lambda name: ledger.doctor_load[name])
+        ledger.doctor_load[doctor] += 1
+        reservation = Reservation(resources.name, kind, number, doctor, now + self.ttl)
+        ledger.reservations[reservation.id] = reservation
+        self._owners[reservation.id] = resources.name.lower()
+        return reservation
+
+    def _held(self, reservation_id: str) -> Tuple[Optional[_DepartmentLedger], Optional[Reservation]]:
+        department = self._owners.get(reservation_id)
+        if department is None:
+            return None, None
+        ledger = self._departments[department]
+        reservation = ledger.reservations.get(reservation_id)
+        if reservation is not None and reservation.expires_at <= time.monotonic():
+            self._drop(ledger, reservation)
+            return ledger, None
+        return ledger, reservation
+
+    def held(self, reservation_id: str) -> Optional[Reservation]:
+        """The reservation while it holds its resources, None once it is released or expired."""
+        return self._held(reservation_id)[1]
+
+    async def confirm(self, reservation_id: str) -> bool:
+        """
+        Keep the resources of a reservation until it is released, once the admission is completed.
+
+        Returns:
+            False when the reservation is unknown, released or expired.
+        """
+        _, reservation = self._held(reservation_id)
+        if reservation is None:
+            return False
+        reservation.expires_at = math.inf
+        return True
+
+    async def release(self, reservation_id: str) -> bool:
+        """
+        Give back the resources of a reservation.
+
+        Returns:
+            False when the reservation is unknown, already released or expired.
+        """
+        ledger, reservation = self._held(reservation_id)
+        if reservation is None:
+            return False
+        self._drop(ledger, reservation)
+        return True
+
+    async def expire(self) -> int:
+        """Drop every pending reservation past its TTL, returning how many were dropped."""
+        now = time.monotonic()
+        expired = sum(self._expire(ledger, now) for ledger in self._departments.values())
+        if expired:
+            logger.info(f"Expired {expired} resource reservations")
+        return expired
+
+    async def sweep(self, interval: float = settings.RESERVATION_SWEEP_INTERVAL) -> None:
+        """Expire pending reservations every ``interval`` seconds, until cancelled."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.expire()
+            except Exception:
+                logger.exception("Failed to expire resource reservations")
+
+    def reservations(self, department: str) -> List[Reservation]:
+        """Reservations currently held in ``department``."""
+        ledger = self._departments.get(department.lower())
+        return list(ledger.reservations.values()) if ledger else []
+
+    def stats(self) -> Dict[str, int]:
+        reservations = [
+            reservation for ledger in self._departments.values() for reservation in ledger.reservations.values()
+        ]
+        confirmed = sum(reservation.confirmed for reservation in reservations)
+        return {"pending": len(reservations) - confirmed, "confirmed": confirmed}
+
+
+reservation_ledger = ReservationLedger()
@@ -0,0 +1,307 @@
+"""
+Process-wide, in-memory view of hospital resources and hospital details
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, TypeVar
+
+import aiofiles
+
+from src.core.config import get_settings
+
+settings = get_settings()
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).parent.parent.parent / "models/data"
+
+T = TypeVar("T")
+
+
+def to_bitmap(numbers: Iterable[int]) -> int:
+    """Pack resource numbers into an int whose bit ``n`` is set when resource ``n`` is available."""
+    bitmap = 0
+    for number in numbers:
+        bitmap |= 1 << number
+    return bitmap
+
+
+def from_bitmap(bitmap: int) -> List[int]:
+    """Unpack a bitmap into the sorted resource numbers it holds."""
+    numbers = []
+    while bitmap:
+        lowest = bitmap & -bitmap
+        numbers.append(lowest.bit_length() - 1)
+        bitmap ^= lowest
+    return numbers
+
+
+def lowest(bitmap: int) -> int:
+    """Return the lowest resource number set in a non-empty bitmap."""
+    return (bitmap & -bitmap).bit_length() - 1
+
+
+class DepartmentResources:
+    """Availability of one department, with beds and stretchers stored as bitmaps."""
+
+    __slots__ = ("name", "max_beds", "beds", "max_stretchers", "stretchers", "max_doctors_on_shift", "doctors")
+
+    def __init__(
+        self,
+        name: str,
+        max_beds: int,
+        beds: int,
+        max_stretchers: int,
+        stretchers: int,
+        max_doctors_on_shift: int,
+        doctors: Tuple[str, ...],
+    ):
+        self.name = name
+        self.max_beds = max_beds
+        self.beds = beds
+        self.max_stretchers = max_stretchers
+        self.stretchers = stretchers
+        self.max_doctors_on_shift = max_doctors_on_shift
+        self.doctors = doctors
+
+    @classmethod
+    def from_row(cls, row: dict) -> "DepartmentResources":
+        return cls(
+            name=row["department"],
+            max_beds=row["max_beds"],
+            beds=to_bitmap(row["available_bed_numbers"]),
+            max_stretchers=row["max_stretchers"],
+            stretchers=to_bitmap(row["available_stretcher_numbers"]),
+            max_doctors_on_shift=row["max_doctors_on_shift"],
+            doctors=tuple(row["doctor_names_available"]),
+        )
+
+    def as_row(self) -> dict:
+        """Render the department in the layout of ``resource_availability.json``."""
+        beds = from_bitmap(self.beds)
+        stretchers = from_bitmap(self.stretchers)
+        return {
+            "department": self.name,
+            "max_beds": self.max_beds,
+            "current_available_beds": len(beds),
+            "available_bed_numbers": beds,
+            "max_stretchers": self.max_stretchers,
+            "current_available_stretchers": len(stretchers),
+            "available_stretcher_numbers": stretchers,
+            "max_doctors_on_shift": self.max_doctors_on_shift,
+            "current_doctors_available": len(self.doctors),
+            "doctor_names_available": list(self.doctors),
+        }
+
+
+class Hospital:
+    """One entry of ``hospital_details.json``, with department ratings indexed by department name."""
+
+    __slots__ = ("name", "location", "contact_number", "ratings")
+
+    def __init__(self, name: str, location: str, contact_number: str, ratings: Dict[str, float]):
+        self.name = name
+        self.location = location
+        self.contact_number = contact_number
+        self.ratings = ratings
+
+    @classmethod
+    def from_row(cls, row: dict) -> "Hospital":
+        return cls(
+            name=row["hospital_name"],
+            location=row["location"],
+            contact_number=row["contact_number"],
+            ratings={department["name"]: department["rating"] for department in row["departments"]},
+        )
+
+    def as_row(self) -> dict:
+        """Render the hospital in the layout of ``hospital_details.json``."""
+        return {
+            "hospital_name": self.name,
+            "location": self.location,
+            "contact_number": self.contact_number,
+            "departments": [{"name": name, "rating": rating} for name, rating in self.ratings.items()],
+        }
+
+
+def location_rank(location: str, origin: str) -> int:
+    """
+    Rank how close a ``"<locality>, <city>"`` location is to ``origin``: 0 same locality, 1 same city, 2 elsewhere.
+
+    Every location ranks 0 when no origin is configured.
+    """
+    if not origin:
+        return 0
+    locality, _, city = (part.strip().lower() for part in location.rpartition(","))
+    origin_locality, _, origin_city = (part.strip().lower() for part in origin.rpartition(","))
+    if locality == origin_locality and city == origin_city:
+        return 0
+    return 1 if city == origin_city else 2
+
+
+class ResourceStore:
+    """
+    Loads the resource and hospital files once and serves them from memory to every agent.
+
+    Departments are indexed by lower-cased name. Each file is re-read only when its mtime changes, checked at most
+    every ``reload_interval`` seconds, and on reload only departments and hospitals whose row changed are rebuilt.
+
+    Hospitals are also indexed by department, sorted by rating, then by closeness to ``location`` and by their order
+    in the file, so redirect candidates are a dictionary lookup. On reload only the departments of changed hospitals
+    are re-sorted.
+    """
+
+    def __init__(
+        self,
+        resource_path: Path = DATA_DIR / "resource_availability.json",
+        hospital_path: Path = DATA_DIR / "hospital_details.json",
+        reload_interval: float = settings.RESOURCE_RELOAD_INTERVAL,
+        location: str = settings.HOSPITAL_LOCATION,
+    ):
+        self.resource_path = resource_path
+        self.hospital_path = hospital_path
+        self.reload_interval = reload_interval
+        self.location = location
+        self._departments: Dict[str, DepartmentResources] = {}
+        self._hospitals: Dict[str, Hospital] = {}
+        self._resource_rows: List[dict] = []
+        self._hospital_rows: List[dict] = []
+        self._redirects: Dict[str, List[Hospital]] = {}
+        self._row_keys: Dict[str, Dict[str, str]] = {"department": {}, "hospital": {}}
+        self._mtimes: Dict[Path, int] = {}
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    async def refresh(self) -> "ResourceStore":
+        """
+        Reload the files that changed since the last check, if the last check is older than ``reload_interval``.
+
+        A file that cannot be parsed (e.g. caught mid-write) is logged and retried on the next check, while the
+        previously loaded data keeps being served.
+
+        Returns:
+            The store itself, so callers can chain the accessors.
+        """
+        if time.monotonic() - self._checked_at < self.reload_interval:
+            return self
+        async with self._lock:
+            if time.monotonic() - self._checked_at < self.reload_interval:
+                return self
+            await self._reload(self.resource_path, self._load_departments)
+            await self._reload(self.hospital_path, self._load_hospitals)
+            self._checked_at = time.monotonic()
+        return self
+
+    async def _reload(self, path: Path, load: Callable[[List[dict]], None]) -> None:
+        mtime = os.stat(path).st_mtime_ns
+        if self._mtimes.get(path) == mtime:
+            return
+        try:
+            async with aiofiles.open(path, "rb") as json_file:
+                load(json.loads(await json_file.read()))
+        except (ValueError, KeyError) as e:
+            if path not in self._mtimes:
+                raise
+            logger.error(f"Keeping the previous data, failed to reload {path}: {e}")
+            return
+        self._mtimes[path] = mtime
+
+    def _reuse(
+        self,
+        kind: str,
+        name: str,
+        row: dict,
+        current: Optional[T],
+        build: Callable[[dict], T],
+        keys: Dict[str, str],
+    ) -> T:
+        """
+        Return ``current`` when its source row is unchanged since the last load, else build a new record.
+
+        The key of the row is recorded in ``keys``, which the loader commits to ``_row_keys`` once every row loaded,
+        so a file failing half way leaves the keys of the records still served untouched.
+        """
+        key = json.dumps(row, sort_keys=True)
+        keys[name] = key
+        unchanged = current is not None and self._row_keys[kind].get(name) == key
+        return current if unchanged else build(row)
+
+    def _load_departments(self, rows: List[dict]) -> None:
+        departments, keys = {}, {}
+        for row in rows:
+            name = row["department"].lower()
+            departments[name] = self._reuse(
+                "department", name, row, self._departments.get(name), DepartmentResources.from_row, keys
+            )
+        self._row_keys["department"] = keys
+        self._departments = departments
+        self._resource_rows = [department.as_row() for department in departments.values()]
+        logger.info(f"Loaded {len(departments)} departments from {self.resource_path}")
+
+    def _load_hospitals(self, rows: List[dict]) -> None:
+        hospitals, keys = {}, {}
+        for row in rows:
+            name = row["hospital_name"]
+            hospitals[name] = self._reuse("hospital", name, row, self._hospitals.get(name), Hospital.from_row, keys)
+        self._row_keys["hospital"] = keys
+        changed = [
+            hospital
+            for name in hospitals.keys() | self._hospitals.keys()
+            if hospitals.get(name) is not self._hospitals.get(name)
+            for hospital in (hospitals.get(name), self._hospitals.get(name))
+            if hospital is not None
+        ]
+        self._hospitals = hospitals
+        self._index_redirects({department.lower() for hospital in changed for department in hospital.ratings})
+        self._hospital_rows = [hospital.as_row() for hospital in hospitals.values()]
+        logger.info(f"Loaded {len(hospitals)} hospitals from {self.hospital_path}")
+
+    def _index_redirects(self, departments: Iterable[str]) -> None:
+        order = {name: position for position, name in enumerate(self._hospitals)}
+        redirects = dict(self._redirects)
+        for department in departments:
+            candidates = []
+            for hospital in self._hospitals.values():
+                rating = next((r for name, r in hospital.ratings.items() if name.lower() == department), None)
+                if rating is not None:
+                    candidates.append(
+                        (-rating, location_rank(hospital.location, self.location), order[hospital.name], hospital)
+                    )
+            if candidates:
+                redirects[department] = [candidate[-1] for candidate in sorted(candidates, key=lambda c: c[:3])]
+            else:
+                redirects.pop(department, None)
+        self._redirects = redirects
+
+    def redirects(self, department: str, k: int = 1) -> List[Hospital]:
+        """Return the ``k`` best hospitals to redirect a patient of ``department`` to, best first."""
+        return self._redirects.get(department.strip().lower(), [])[:k]
+
+    def department(self, name: str) -> Optional[DepartmentResources]:
+        return self._departments.get(name.strip().lower())
+
+    @property
+    def departments(self) -> List[DepartmentResources]:
+        return list(self._departments.values())
+
+    @property
+    def hospitals(self) -> List[Hospital]:
+        return list(self._hospitals.values())
+
+    @property
+    def resource_rows(self) -> List[dict]:
+        """Every department in the layout of ``resource_availability.json``."""
+        return self._resource_rows
+
+    @property
+    def hospital_rows(self) -> List[dict]:
+        """Every hospital in the layout of ``hospital_details.json``."""
+        return self._hospital_rows
+
+
+resource_store = ResourceStore()
@@ -0,0 +1,65 @@
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+# settings are read once at import time, so point the workflow checkpoints at a scratch file before src is imported
+os.environ.setdefault("WORKFLOW_CHECKPOINT_PATH", os.path.join(tempfile.mkdtemp(), "checkpoints.db"))
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+
+@pytest.fixture(autouse=True)
+def close_workflow_checkpointer():
+    """
+    Close the checkpointer's connection after each test, since its worker thread would otherwise keep pytest from
+    exiting, and drop the graph compiled with it so the next test builds both on its own event loop.
+    """
+    yield
+    from src.agents.agent_smart_automation import get_graph
+    from src.services.checkpoint.sqlite import workflow_checkpointer
+
+    asyncio.run(workflow_checkpointer.close())
+    get_graph.cache_clear()
+
+
+@pytest.fixture
+def stub_chain(monkeypatch):
+    """
+    Replace a registered chain with one answering ``response`` after ``delay`` seconds, without blocking the event
+    loop. An exception given as the response is raised instead.
+    """
+    from langchain_core.runnables import RunnableLambda
+
+    from src.services.llm.registry import chain_registry
+
+    def stub(name, response, delay=0.0):
+        async def answer(inputs):
+            await asyncio.sleep(delay)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        monkeypatch.setitem(chain_registry._chains, name, RunnableLambda(answer))
+
+    return stub
+
+
+@pytest.fixture
+def stub_triage(stub_chain):
+    """
+    Answer the triage and verification chains, staged and fused, with one outcome, so the workflow takes the same
+    path whether or not ``FUSED_TRIAGE_VERIFICATION`` is enabled.
+    """
+    from src.agents.agent_smart_automation import TriageResponse, TriageVerificationResponse, VerificationResponse
+
+    def stub(criticality, verified, fallback_response=None, delay=0.0):
+        stub_chain("triage", TriageResponse(criticality=criticality), delay)
+        stub_chain("verification", VerificationResponse(verified=verified, fallback_response=fallback_response), delay)
+        stub_chain(
+            "triage_verification",
+            TriageVerificationResponse(criticality=criticality, verified=verified, fallback_response=fallback_response),
+            delay,
+        )
+
+    return stub
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from src.agents.admission import AdmissionController, AdmissionRejected
+
+
+def test_expected_wait_spreads_the_queue_over_every_slot():
+    controller = AdmissionController("test_expected_wait", limit=16, timeout=30.0)
+    controller._run_seconds = 40.0
+
+    # with 16 requests running for 40 s on average, one finishes every 2.5 s
+    assert controller.expected_wait(0) == 2.5
+    assert controller.expected_wait(15) == 40.0
+
+
+def test_requests_queue_behind_runs_longer_than_the_timeout():
+    async def run():
+        controller = AdmissionController("test_long_runs", limit=2, queue_size=4, timeout=30.0)
+        controller._run_seconds = 40.0
+        await controller.acquire()
+        await controller.acquire()
+        # with both slots busy, one frees up 20 s from now on average
+        waiting = asyncio.ensure_future(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.stats()["queue_depth"] == 1
+        # the next one would wait 40 s, longer than its deadline
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire()
+        controller.release()
+        await waiting
+
+    asyncio.run(run())
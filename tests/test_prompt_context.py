@@ -0,0 +1,31 @@
+import asyncio
+import json
+
+import pytest
+
+from src.services.resources.context import prompt_context
+from src.services.resources.store import ResourceStore
+
+
+@pytest.fixture(scope="module")
+def store():
+    return asyncio.run(ResourceStore().refresh())
+
+
+def departments(store, case_sheet):
+    rows = json.loads(prompt_context(store, "doctor_appointment", case_sheet, hospitals=False)["resource_availability"])
+    return "all" if len(rows) == len(store.departments) else [row["department"] for row in rows]
+
+
+@pytest.mark.parametrize(
+    "case_sheet, expected",
+    [
+        # ICU inside a longer word is not a department
+        ("Difficulty sleeping, no particular complaints.", "all"),
+        ("Needs a Cardiology or Neurology review.", "all"),
+        ("Chest pain, cardiology consult requested.", ["Cardiology"]),
+        ("Admit to the Respiratory ICU.", ["Respiratory ICU"]),
+    ],
+)
+def test_case_sheets_only_prune_to_an_unambiguous_department(store, case_sheet, expected):
+    assert departments(store, case_sheet) == expected
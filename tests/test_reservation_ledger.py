@@ -0,0 +1,92 @@
+import asyncio
+import time
+from collections import Counter
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api import reservations
+from src.services.resources.allocator import allocate
+from src.services.resources.ledger import ReservationLedger
+from src.services.resources.store import ResourceStore
+
+ADMISSIONS = 800
+
+
+async def admit_concurrently(store, ledger, admissions):
+    departments = [resources.name for resources in store.departments]
+
+    async def admit(index):
+        department = departments[index % len(departments)]
+        # every admission re-checks the store first, the way the resource availability agent does
+        await store.refresh()
+        return department, await allocate(store, {"department": department}, ledger)
+
+    return await asyncio.gather(*(admit(index) for index in range(admissions)))
+
+
+def test_concurrent_admissions_never_share_a_resource():
+    async def run():
+        store = await ResourceStore(reload_interval=0).refresh()
+        ledger = ReservationLedger()
+        started = time.perf_counter()
+        decisions = await admit_concurrently(store, ledger, ADMISSIONS)
+        return store, decisions, time.perf_counter() - started
+
+    store, decisions, seconds = asyncio.run(run())
+
+    accepted = [
+        (department, decision) for department, decision in decisions if decision["admission_status"] == "Accepted"
+    ]
+    held = Counter(
+        (department, resource["type"], resource["number"])
+        for department, decision in accepted
+        for resource in decision["assigned_resource"]
+    )
+    assert held and max(held.values()) == 1
+    free = sum(
+        bin(resources.beds).count("1") + bin(resources.stretchers).count("1")
+        for resources in store.departments
+        if resources.doctors
+    )
+    # each department gets more requests than it has resources, so every free resource is handed out exactly once
+    assert len(accepted) == free
+    print(f"{ADMISSIONS} concurrent admissions in {seconds * 1000:.1f} ms")
+
+
+def test_pending_reservations_expire_and_confirmed_ones_are_kept():
+    async def run():
+        store = await ResourceStore().refresh()
+        ledger = ReservationLedger(ttl=0.05)
+        cardiology = store.department("Cardiology")
+        pending = await ledger.reserve(cardiology)
+        confirmed = await ledger.reserve(cardiology)
+        assert await ledger.confirm(confirmed.id)
+        await asyncio.sleep(0.1)
+        assert await ledger.expire() == 1
+        assert not await ledger.confirm(pending.id)
+        assert [reservation.id for reservation in ledger.reservations("Cardiology")] == [confirmed.id]
+        # the expired bed is the lowest free one again
+        assert (await ledger.reserve(cardiology)).number == pending.number
+
+    asyncio.run(run())
+
+
+def test_discharge_releases_the_resource(monkeypatch):
+    ledger = ReservationLedger()
+    monkeypatch.setattr(reservations, "reservation_ledger", ledger)
+
+    async def reserve():
+        store = await ResourceStore().refresh()
+        reservation = await ledger.reserve(store.department("Cardiology"))
+        await ledger.confirm(reservation.id)
+        return reservation
+
+    reservation = asyncio.run(reserve())
+    app = FastAPI()
+    app.include_router(reservations.router)
+    client = TestClient(app)
+
+    assert client.delete(f"/v1/reservations/{reservation.id}").status_code == 204
+    assert client.delete(f"/v1/reservations/{reservation.id}").status_code == 404
+    assert ledger.reservations("Cardiology") == []
@@ -0,0 +1,49 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from src.agents.agent_smart_automation import TIMEOUT_FALLBACK_RESPONSE, settings, smart_automation
+from src.agents.dispatch import LocalAgentContext
+
+LLM_DELAY = 0.2
+INCOMPLETE = "Please resubmit the case sheet with the vital signs."
+
+
+@pytest.fixture(autouse=True)
+def stub_llm(stub_triage):
+    # an unverified LowRisk sheet ends after verification
+    stub_triage("LowRisk", "no", INCOMPLETE, delay=LLM_DELAY)
+
+
+def case_sheet():
+    return f"Patient {uuid.uuid4()} with a mild headache."
+
+
+async def run_sheets(count):
+    context = LocalAgentContext("smart_automation")
+    started = time.perf_counter()
+    results = await asyncio.gather(*(smart_automation(context, case_sheet()) for _ in range(count)))
+    return time.perf_counter() - started, results
+
+
+def test_concurrent_sheets_take_as_long_as_one():
+    async def run():
+        single, _ = await run_sheets(1)
+        concurrent, results = await run_sheets(10)
+        return single, concurrent, results
+
+    single, concurrent, results = asyncio.run(run())
+
+    assert all(INCOMPLETE in result for result in results)
+    # ten sheets run one after the other would take ten times as long
+    assert concurrent < 2 * single
+
+
+def test_model_timeout_answers_with_fallback(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_TIMEOUT", LLM_DELAY / 4)
+
+    _, results = asyncio.run(run_sheets(1))
+
+    assert TIMEOUT_FALLBACK_RESPONSE in results[0]
@@ -0,0 +1,52 @@
+import json
+import uuid
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.api.triage import router
+
+RESUBMIT = "Please resubmit the case sheet with the vital signs."
+
+
+def events(body):
+    return [
+        (lines[0].removeprefix("event: "), json.loads(lines[1].removeprefix("data: ")))
+        for lines in (block.split("\n") for block in body.strip().split("\n\n"))
+    ]
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router)
+    with TestClient(app) as client:
+        yield client
+
+
+def test_failed_workflow_closes_the_stream_with_an_error_event(client, stub_chain):
+    error = ValueError("model answer is not valid JSON")
+    stub_chain("triage", error)
+    stub_chain("triage_verification", error)
+
+    response = client.post("/v1/triage/stream", json={"case_sheet": f"Patient {uuid.uuid4()}"})
+
+    assert response.status_code == 200
+    assert events(response.text)[-1] == ("error", {"error": "model answer is not valid JSON"})
+
+
+def test_notes_only_stream_leaves_out_node_events(client, stub_triage):
+    # an unverified LowRisk sheet ends after verification
+    stub_triage("LowRisk", "no", RESUBMIT)
+
+    progress = events(client.post("/v1/triage/stream", json={"case_sheet": f"Patient {uuid.uuid4()}"}).text)
+    notes = events(
+        client.post(
+            "/v1/triage/stream", params={"progress": "false"}, json={"case_sheet": f"Patient {uuid.uuid4()}"}
+        ).text
+    )
+
+    assert "node" in {event for event, _ in progress}
+    assert "node" not in {event for event, _ in notes}
+    assert notes[-1] == ("result", {"result": RESUBMIT})
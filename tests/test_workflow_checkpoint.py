@@ -0,0 +1,93 @@
+import asyncio
+import uuid
+
+import pytest
+
+from src.agents import agent_smart_automation
+from src.agents.agent_smart_automation import get_graph, run_workflow, workflow_thread_id
+from src.services.checkpoint.sqlite import workflow_checkpointer
+from src.services.resources.allocator import allocate
+from src.services.resources.ledger import reservation_ledger
+from src.services.resources.store import resource_store
+
+
+@pytest.fixture(autouse=True)
+def stub_workflow(monkeypatch, stub_chain, stub_triage):
+    async def search_case_history(state, config):
+        state["history"] = "No earlier admissions."
+        return state
+
+    async def emergency_action_list(state):
+        state["actions"] = {"department": "Cardiology", "presenting_complaint": "Chest pain"}
+        return state
+
+    async def check_resource_availability(state):
+        # the rule-based allocation the resource availability agent makes for a department it can resolve
+        state["resource_allocation"] = await allocate(await resource_store.refresh(), state["actions"])
+        return state
+
+    monkeypatch.setattr(agent_smart_automation, "search_case_history", search_case_history)
+    monkeypatch.setattr(agent_smart_automation, "emergency_action_list", emergency_action_list)
+    monkeypatch.setattr(agent_smart_automation, "check_resource_availability", check_resource_availability)
+    stub_triage("HighRisk", "yes")
+    stub_chain("handover_summary", "Handover summary.")
+    get_graph.cache_clear()
+    yield
+    get_graph.cache_clear()
+
+
+def test_resubmissions_keep_their_bed_and_other_patients_get_their_own():
+    case_sheet = f"Patient {uuid.uuid4()} with crushing chest pain."
+
+    async def run():
+        first = await run_workflow(case_sheet, "patient-1")
+        resubmitted = await run_workflow(case_sheet, "patient-1")
+        other = await run_workflow(case_sheet, "patient-2")
+        return first, resubmitted, other
+
+    first, resubmitted, other = asyncio.run(run())
+
+    allocations = [response["resource_allocation"] for response in (first, resubmitted, other)]
+    assert all(allocation["admission_status"] == "Accepted" for allocation in allocations)
+    # a retry is answered with the stored result instead of holding a second bed
+    assert resubmitted == first
+    assert allocations[2]["assigned_resource"] != allocations[0]["assigned_resource"]
+    for allocation in (allocations[0], allocations[2]):
+        assert reservation_ledger.held(allocation["reservation_id"]).confirmed
+
+
+def test_resubmission_after_discharge_allocates_again():
+    case_sheet = f"Patient {uuid.uuid4()} with crushing chest pain."
+
+    async def run():
+        first = await run_workflow(case_sheet)
+        await reservation_ledger.release(first["resource_allocation"]["reservation_id"])
+        return first, await run_workflow(case_sheet)
+
+    first, second = asyncio.run(run())
+
+    reservation_id = second["resource_allocation"]["reservation_id"]
+    assert reservation_id != first["resource_allocation"]["reservation_id"]
+    assert reservation_ledger.held(reservation_id).confirmed
+
+
+def test_runs_past_the_checkpoint_ttl_are_forgotten_and_pruned():
+    case_sheet = f"Patient {uuid.uuid4()} with crushing chest pain."
+    thread_id = workflow_thread_id(case_sheet)
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+
+    async def run():
+        await run_workflow(case_sheet)
+        saver = workflow_checkpointer.get()
+        assert await saver.aget_tuple(config) is not None
+        saver.ttl = 0.0
+        expired = await saver.aget_tuple(config)
+        await saver.prune()
+        async with saver.conn.execute("SELECT COUNT(*) FROM checkpoints WHERE thread_id = ?", (thread_id,)) as cursor:
+            (remaining,) = await cursor.fetchone()
+        return expired, remaining
+
+    expired, remaining = asyncio.run(run())
+
+    assert expired is None
+    assert remaining == 0